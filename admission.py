@@ -0,0 +1,310 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from database import get_threads
+
+# Kelas prioritas: tulis (intake) boleh dibuang saat sibuk, baca (dashboard) tetap dilayani
+WRITE_ENDPOINTS = {"diagnosis", "create_feedback"}
+PRIORITY_WRITE = "write"
+PRIORITY_READ = "read"
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def client_key():
+    """Alamat klien; di belakang proxy sudah dikoreksi ProxyFix (TRUSTED_PROXY_HOPS) di app.py."""
+    return request.remote_addr or "unknown"
+
+
+def trusted_proxy_configured():
+    """
+    TRUSTED_PROXY_HOPS diisi secara eksplisit (0 = gunicorn langsung menerima
+    klien). Jika kosong, remote_addr bisa jadi alamat router platform yang
+    sama untuk semua pengguna.
+    """
+    return os.environ.get("TRUSTED_PROXY_HOPS", "").strip() != ""
+
+
+def parse_request_start(value, now=None):
+    """
+    Epoch dari header X-Request-Start ("t=1700000000.123", milidetik, atau
+    mikrodetik). Satuan ditebak dari besar angkanya; None jika tidak masuk akal.
+    """
+    now = time.time() if now is None else now
+    try:
+        started = float(value.strip().replace("t=", ""))
+    except (AttributeError, ValueError):
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    # Jam proxy dan server tidak pernah selisih sejauh ini
+    if not now - 3600 < started < now + 60:
+        return None
+    return started
+
+
+class MemoryBucketStore:
+    """Token bucket di memori proses (per worker gunicorn)."""
+
+    def __init__(self, max_keys=50000):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._refill_seconds = 0.0
+        self.max_keys = max_keys
+
+    def take(self, key, rate, burst, now=None):
+        """Mengambil satu token. Mengembalikan (diizinkan, detik_tunggu)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, wait = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, wait = False, (1 - tokens) / rate
+            self._refill_seconds = max(self._refill_seconds, burst / rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, wait
+
+    def _prune(self, now):
+        # Bucket yang sudah penuh kembali sama dengan bucket baru, tidak perlu disimpan
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < self._refill_seconds}
+
+
+class SQLiteBucketStore:
+    """Token bucket di file SQLite lokal, dipakai bersama oleh semua worker di satu host."""
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._refill_seconds = 0.0
+        self._last_prune = 0.0
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Koneksi per thread dan per proses (aman setelah fork gunicorn)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM token_bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                allowed, wait = True, 0.0
+            else:
+                allowed, wait = False, (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO token_bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._refill_seconds = max(self._refill_seconds, burst / rate)
+        if now - self._last_prune >= self.PRUNE_INTERVAL:
+            self._last_prune = now
+            self._prune(conn, now)
+        return allowed, wait
+
+    def _prune(self, conn, now):
+        # Bucket yang sudah penuh kembali sama dengan bucket baru, tidak perlu disimpan
+        conn.execute("DELETE FROM token_bucket WHERE updated < ?", (now - self._refill_seconds,))
+
+
+def make_bucket_store(url):
+    """RATE_LIMIT_STORAGE: 'memory' (default) atau 'sqlite:///path/ke/file.db'."""
+    if not url or url == "memory":
+        return MemoryBucketStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteBucketStore(url[len("sqlite:///"):])
+    raise ValueError(f"RATE_LIMIT_STORAGE tidak dikenal: {url}")
+
+
+class AdmissionController:
+    """
+    Rate limit token bucket (per klien dan global) untuk endpoint tulis, batas
+    request paralel per kelas prioritas, dan load shedding berdasarkan latensi
+    tulis rata-rata atau lama antre di router (header X-Request-Start).
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._inflight = {PRIORITY_WRITE: 0, PRIORITY_READ: 0}
+        self._latency_ewma = 0.0
+        self._shed_until = 0.0
+        self.admitted = {PRIORITY_WRITE: 0, PRIORITY_READ: 0}
+        self.rejected = {}
+
+    def init_app(self, app):
+        self.enabled = os.environ.get("ADMISSION_ENABLED", "true").lower() not in ("0", "false", "no", "off")
+        self.store = make_bucket_store(os.environ.get("RATE_LIMIT_STORAGE", "memory"))
+        self.client_rate = _env_float("RATE_LIMIT_CLIENT_RATE", 0.5)
+        if self.client_rate > 0 and not trusted_proxy_configured():
+            # Tanpa konfigurasi proxy semua pengguna bisa berbagi satu bucket
+            print("⚠️  TRUSTED_PROXY_HOPS belum diisi; rate limit per klien dimatikan "
+                  "(isi 0 jika gunicorn langsung menerima klien, 1 di belakang router Heroku/Railway)")
+            self.client_rate = 0
+        self.client_burst = _env_float("RATE_LIMIT_CLIENT_BURST", 10)
+        self.global_rate = _env_float("RATE_LIMIT_GLOBAL_RATE", 50)
+        self.global_burst = _env_float("RATE_LIMIT_GLOBAL_BURST", 100)
+        # Batas per worker: tulis hanya boleh memakai separuh thread gthread
+        # sehingga selalu ada thread kosong untuk baca dashboard (0 = tanpa batas)
+        threads = get_threads()
+        self.max_inflight = {
+            PRIORITY_WRITE: int(_env_float("ADMISSION_MAX_INFLIGHT_WRITE", max(1, threads // 2))),
+            PRIORITY_READ: int(_env_float("ADMISSION_MAX_INFLIGHT_READ", 0)),
+        }
+        # Lonjakan singkat menunggu slot kosong dulu, tidak langsung ditolak
+        self.inflight_wait = _env_float("ADMISSION_INFLIGHT_WAIT_MS", 2000) / 1000
+        self.latency_threshold = _env_float("ADMISSION_LATENCY_MS", 5000) / 1000
+        self.queue_threshold = _env_float("ADMISSION_QUEUE_MS", 10000) / 1000
+        self.retry_after = _env_float("ADMISSION_RETRY_AFTER", 5)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _priority(self):
+        if request.endpoint in WRITE_ENDPOINTS and request.method == "POST":
+            return PRIORITY_WRITE
+        return PRIORITY_READ
+
+    def _reject(self, status, reason, retry_after):
+        with self._lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        message = "Terlalu banyak permintaan" if status == 429 else "Server sedang sibuk, coba lagi nanti"
+        response = jsonify({"error": message})
+        response.status_code = status
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _queue_time(self):
+        now = time.time()
+        started = parse_request_start(request.headers.get("X-Request-Start", ""), now)
+        return 0.0 if started is None else max(0.0, now - started)
+
+    def _before_request(self):
+        if not self.enabled or request.method == "OPTIONS":
+            return None
+        priority = self._priority()
+
+        if priority == PRIORITY_WRITE:
+            now = time.monotonic()
+            with self._lock:
+                if now < self._shed_until:
+                    wait = self._shed_until - now
+                    overloaded = True
+                elif self._latency_ewma > self.latency_threshold:
+                    # Buka lagi setelah jeda; EWMA direset agar bisa pulih
+                    self._shed_until = now + self.retry_after
+                    self._latency_ewma = 0.0
+                    wait, overloaded = self.retry_after, True
+                else:
+                    overloaded = False
+            if overloaded:
+                return self._reject(503, "latency", wait)
+            if self.queue_threshold and self._queue_time() > self.queue_threshold:
+                return self._reject(503, "queue", self.retry_after)
+
+        # Slot dulu, baru token: request yang ditolak 503 tidak memakan kuota
+        if not self._acquire_slot(priority):
+            return self._reject(503, f"{priority}_concurrency", self.retry_after)
+
+        if priority == PRIORITY_WRITE:
+            limited = None
+            if self.global_rate > 0:
+                allowed, wait = self.store.take("global", self.global_rate, self.global_burst)
+                if not allowed:
+                    limited = ("global_rate", wait)
+            if limited is None and self.client_rate > 0:
+                allowed, wait = self.store.take(f"client:{client_key()}", self.client_rate, self.client_burst)
+                if not allowed:
+                    limited = ("client_rate", wait)
+            if limited is not None:
+                self._release_slot(priority)
+                return self._reject(429, *limited)
+
+        with self._lock:
+            self.admitted[priority] += 1
+        g.admission = (priority, time.monotonic())
+        return None
+
+    def _acquire_slot(self, priority):
+        limit = self.max_inflight[priority]
+        deadline = time.monotonic() + self.inflight_wait
+        with self._slot_free:
+            while limit > 0 and self._inflight[priority] >= limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._slot_free.wait(remaining)
+            self._inflight[priority] += 1
+        return True
+
+    def _release_slot(self, priority):
+        with self._slot_free:
+            self._inflight[priority] -= 1
+            self._slot_free.notify_all()
+
+    def _teardown_request(self, exc):
+        admitted = g.pop("admission", None)
+        if admitted is None:
+            return
+        priority, started = admitted
+        elapsed = time.monotonic() - started
+        with self._slot_free:
+            self._inflight[priority] -= 1
+            self._slot_free.notify_all()
+            if priority == PRIORITY_WRITE:
+                self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * elapsed
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "inflight": dict(self._inflight),
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected),
+                "write_latency_ewma_ms": round(self._latency_ewma * 1000, 2),
+                "shedding": time.monotonic() < self._shed_until,
+            }
+
+
+admission_controller = AdmissionController()
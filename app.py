@@ -1,45 +1,158 @@
 import os
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
+import csv
+import hashlib
+import io
+import json
+import threading
+import time
 from datetime import datetime, timedelta
-from sqlalchemy import func
-
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from admission import admission_controller
+from arsip import ArsipSibuk, ArsipStore, Pengarsip, add_months, month_start, parse_month
+from database import (
+    build_engine_options, attach_pool_stats, normalize_database_url,
+    RoutingSession, replica_router, REPLICA_BIND, STICKY_HEADER,
+)
 from fuzzy import fuzzy_diagnosis
-from utils import calculate_bmi, get_bmi_category, klasifikasi_tekanan_darah
+from idempotency import IdempotencyStore, idempotency_key
+from shadow import ShadowScorer
+from utils import calculate_bmi, get_bmi_category, klasifikasi_tekanan_darah, format_diagnosis_result
 
 app = Flask(__name__)
 
+# Jumlah proxy tepercaya di depan gunicorn (Heroku/Railway: 1). Alamat klien
+# untuk rate limit diambil dari X-Forwarded-For sebanyak hop ini saja. Jika
+# tidak diisi, rate limit per klien dimatikan (lihat admission.py).
+proxy_hops = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if proxy_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
 # Konfigurasi CORS
 frontend_url = os.environ.get('FRONTEND_URL', "https://frontend-sistempakar.vercel.app")
-CORS(app, resources={r"/api/*": {"origins": [frontend_url, "http://localhost:5173"]}})
+# Credentials dan header sticky diperlukan agar read-your-writes replica berlaku lintas situs
+CORS(app, resources={r"/api/*": {"origins": [frontend_url, "http://localhost:5173"]}},
+     supports_credentials=True, expose_headers=[STICKY_HEADER])
 
 # Konfigurasi Database
-DATABASE_URL_FROM_ENV = os.environ.get('DATABASE_URL')
+DATABASE_URL_FROM_ENV = normalize_database_url(os.environ.get('DATABASE_URL'))
 if DATABASE_URL_FROM_ENV:
-    if DATABASE_URL_FROM_ENV.startswith("mysql://"):
-        DATABASE_URL_FROM_ENV = DATABASE_URL_FROM_ENV.replace("mysql://", "mysql+pymysql://", 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL_FROM_ENV
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost/db_sistempakar'
 
+# Read replica opsional untuk route GET
+DATABASE_READ_URL = normalize_database_url(os.environ.get('DATABASE_READ_URL'))
+if DATABASE_READ_URL:
+    app.config['SQLALCHEMY_BINDS'] = {
+        REPLICA_BIND: {'url': DATABASE_READ_URL, **build_engine_options(DATABASE_READ_URL)}
+    }
+
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 # Konfigurasi Secret Key
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default_dev_secret_key_please_change_in_prod')
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+migrate = Migrate(app, db)
+replica_router.init_app(app, db)
+
+# Rate limit dan load shedding
+admission_controller.init_app(app)
+
+# Evaluasi model kandidat (SHADOW_MODELS) di luar jalur request
+shadow_scorer = ShadowScorer()
+
+# Telemetri pool koneksi
+with app.app_context():
+    pool_stats = {"primary": attach_pool_stats(db.engine, "primary")}
+    if DATABASE_READ_URL:
+        pool_stats[REPLICA_BIND] = attach_pool_stats(db.engines[REPLICA_BIND], REPLICA_BIND)
 
 # MODEL
+# ID kompak; SQLite hanya auto-increment untuk INTEGER PRIMARY KEY
+KatalogId = db.SmallInteger().with_variant(db.Integer(), "sqlite")
+
+class HasilDiagnosis(db.Model):
+    """Katalog kombinasi diagnosis, risiko, dan saran (hanya beberapa baris)."""
+    __tablename__ = 'hasil_diagnosis'
+
+    id = db.Column(KatalogId, primary_key=True, autoincrement=True)
+    kode = db.Column(db.String(64), nullable=False, unique=True)
+    diagnosis = db.Column(db.String(100))
+    risiko = db.Column(db.String(50))
+    saran = db.Column(db.Text)
+
+def kode_hasil(diagnosis, risiko, saran):
+    raw = "\x1f".join(v or "" for v in (diagnosis, risiko, saran))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class HasilKatalog:
+    """Cache in-memory tabel hasil_diagnosis: id <-> (diagnosis, risiko, saran)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_kode = {}
+
+    def _load(self):
+        table = HasilDiagnosis.__table__
+        with db.engine.connect() as conn:
+            rows = conn.execute(select(table.c.id, table.c.kode, table.c.diagnosis, table.c.risiko, table.c.saran)).all()
+        with self._lock:
+            for row in rows:
+                self._by_id[row.id] = (row.diagnosis, row.risiko, row.saran)
+                self._by_kode[row.kode] = row.id
+
+    def get(self, hasil_id):
+        if hasil_id is None:
+            return (None, None, None)
+        if hasil_id not in self._by_id:
+            self._load()
+        return self._by_id.get(hasil_id, (None, None, None))
+
+    def get_id(self, diagnosis, risiko, saran):
+        kode = kode_hasil(diagnosis, risiko, saran)
+        if kode in self._by_kode:
+            return self._by_kode[kode]
+        self._load()
+        if kode not in self._by_kode:
+            # Insert di koneksi terpisah agar transaksi request tidak ikut rollback
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(HasilDiagnosis.__table__).values(
+                        kode=kode, diagnosis=diagnosis, risiko=risiko, saran=saran))
+            except IntegrityError:
+                pass  # Sudah dibuat worker lain
+            self._load()
+        return self._by_kode[kode]
+
+    def seed(self):
+        """Memastikan semua hasil dari format_diagnosis_result ada di katalog."""
+        for score in (0, 20, 50, 80):
+            hasil = format_diagnosis_result(score)
+            self.get_id(hasil['diagnosis'], hasil['risiko'], hasil['saran'])
+
+hasil_katalog = HasilKatalog()
+
+# Di MySQL tabel diagnosa dipartisi per bulan (migrasi 8d4b2f6a1c3e): primary key
+# (id, created_at) dan tanpa foreign key, karena InnoDB tidak mendukung foreign key
+# pada tabel berpartisi. Model mengikuti skema itu agar autogenerate tidak menambahkannya lagi.
+DIAGNOSA_BERPARTISI = app.config['SQLALCHEMY_DATABASE_URI'].startswith("mysql")
+FK_HASIL = [] if DIAGNOSA_BERPARTISI else [db.ForeignKey('hasil_diagnosis.id', name='fk_diagnosa_hasil_id')]
+
 class Diagnosa(db.Model):
     __tablename__ = 'diagnosa'
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nama = db.Column(db.String(100), nullable=False)
     usia = db.Column(db.Integer, nullable=False)
     jenis_kelamin = db.Column(db.String(20), nullable=False)
@@ -53,12 +166,26 @@ class Diagnosa(db.Model):
     riwayat_penyakit = db.Column(db.String(50))
     riwayat_merokok = db.Column(db.String(50))
     aspek_psikologis = db.Column(db.String(100))
-    diagnosis = db.Column(db.String(100))
+    hasil_id = db.Column(KatalogId, *FK_HASIL, nullable=False)
     persentase = db.Column(db.Float)
-    risiko = db.Column(db.String(50))
-    saran = db.Column(db.Text)
     gejala = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, primary_key=DIAGNOSA_BERPARTISI, nullable=False,
+                           default=datetime.utcnow, index=True)
+
+    # Identitas ORM tetap id saja sehingga Diagnosa.query.get(id) tidak berubah
+    __mapper_args__ = {"primary_key": [id]}
+
+    @property
+    def diagnosis(self):
+        return hasil_katalog.get(self.hasil_id)[0]
+
+    @property
+    def risiko(self):
+        return hasil_katalog.get(self.hasil_id)[1]
+
+    @property
+    def saran(self):
+        return hasil_katalog.get(self.hasil_id)[2]
 
 class Feedback(db.Model):
     __tablename__ = 'feedback'
@@ -69,7 +196,148 @@ class Feedback(db.Model):
     pesan = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class IdempotencyKey(db.Model):
+    """Kunci idempotensi /api/diagnosis; primary key unik lintas worker (lihat idempotency.py)."""
+    __tablename__ = 'idempotency_key'
+
+    kunci = db.Column(db.String(64), primary_key=True)
+    payload_hash = db.Column(db.String(64), nullable=False)
+    pemilik = db.Column(db.String(32), nullable=False)  # Request yang memegang klaim
+    status = db.Column(db.Integer)  # NULL = sedang diproses
+    response = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# Penyimpanan hasil untuk kiriman ulang /api/diagnosis
+idempotency_store = IdempotencyStore(db, IdempotencyKey.__table__)
+
+def diagnosa_detail(data):
+    return {
+        "id": data.id,
+        "nama": data.nama,
+        "usia": data.usia,
+        "jenis_kelamin": data.jenis_kelamin,
+        "berat_badan": data.berat_badan,
+        "tinggi_badan": data.tinggi_badan,
+        "bmi": data.bmi,
+        "kategori_bmi": data.kategori_bmi,
+        "sistolik": data.sistolik,
+        "diastolik": data.diastolik,
+        "kategori_tekanan_darah": data.kategori_tekanan_darah,
+        "riwayat_penyakit": data.riwayat_penyakit,
+        "riwayat_merokok": data.riwayat_merokok,
+        "aspek_psikologis": data.aspek_psikologis,
+        "diagnosis": data.diagnosis,
+        "persentase": data.persentase,
+        "risiko": data.risiko,
+        "saran": data.saran,
+        "gejala": data.gejala
+        }
+
+def diagnosa_arsip(data):
+    return {**diagnosa_detail(data), "created_at": data.created_at.isoformat()}
+
+# Arsip bulan lama dan partisi per bulan. ARCHIVE_DIR harus volume persisten
+# yang dipakai bersama semua host, bukan filesystem sementara dyno: baris yang
+# diarsipkan dihapus dari database.
+arsip_store = ArsipStore(os.environ.get('ARCHIVE_DIR'))
+pengarsip = Pengarsip(
+    db, Diagnosa, diagnosa_arsip, arsip_store,
+    hot_months=int(os.environ.get('DIAGNOSA_HOT_MONTHS', 12)),
+    months_ahead=int(os.environ.get('DIAGNOSA_PARTITION_AHEAD', 3)),
+)
+
+@app.cli.command("arsip-diagnosa")
+def arsip_diagnosa_command():
+    """
+    Menyiapkan partisi bulan depan dan mengarsipkan bulan di luar jendela hot.
+    Jadwalkan harian sebagai proses terpisah (cron / Heroku Scheduler):
+    flask --app app arsip-diagnosa
+    """
+    try:
+        pengarsip.run()
+    except ArsipSibuk as e:
+        print(f"⏭️  Dilewati: {e}")
+
 # ENDPOINT DIAGNOSIS
+def proses_diagnosis(data):
+    """Menghitung diagnosis fuzzy dan menyimpannya ke tabel diagnosa."""
+    # Ekstrak semua data
+    age = int(data["usia"])
+    gender_str = data["gender"]
+    weight = float(data["weight"])
+    height = float(data["height"])
+    sistolik = int(data["sistolik"])
+    diastolik = int(data["diastolik"])
+    riwayat_penyakit = data["riwayatPenyakit"]
+    riwayat_merokok = data["riwayatMerokok"]
+    aspek_psikologis = data["aspekPsikologis"]
+    symptoms = data["gejala"]
+
+    # Proses data
+    bmi = calculate_bmi(weight, height)
+    kategori_bmi = get_bmi_category(bmi)
+    kategori_tekanan_darah = klasifikasi_tekanan_darah(sistolik, diastolik)
+
+    print(f"🔍 DEBUG - Sistolik: {sistolik}, Diastolik: {diastolik}")
+    print(f"🔍 DEBUG - Kategori tekanan darah: {kategori_tekanan_darah}")
+    
+    fuzzy_inputs = (
+        age, gender_str, bmi, sistolik, diastolik, 
+        riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms
+    )
+    fuzzy_start = time.perf_counter()
+    diagnosis_result, percentage, risiko, saran = fuzzy_diagnosis(*fuzzy_inputs)
+    fuzzy_latency = time.perf_counter() - fuzzy_start
+
+    new_diagnosis = Diagnosa(
+        nama=data["nama"], 
+        usia=age, 
+        jenis_kelamin=gender_str,
+        berat_badan=weight, 
+        tinggi_badan=height, 
+        bmi=bmi, 
+        kategori_bmi=kategori_bmi,
+        sistolik=sistolik,
+        diastolik=diastolik,
+        kategori_tekanan_darah=kategori_tekanan_darah,
+        riwayat_penyakit=riwayat_penyakit,
+        riwayat_merokok=riwayat_merokok,
+        aspek_psikologis=aspek_psikologis,
+        hasil_id=hasil_katalog.get_id(diagnosis_result, risiko, saran),
+        persentase=percentage, 
+        gejala=str(symptoms)
+    )
+    
+    db.session.add(new_diagnosis)
+    db.session.commit()
+    shadow_scorer.submit(fuzzy_inputs, percentage, risiko, fuzzy_latency)
+
+    # Kirim response ke frontend
+    response_data = {
+        "nama": data["nama"], 
+        "usia": age, 
+        "gender": gender_str,
+        "weight": weight, 
+        "height": height, 
+        "bmi": round(bmi, 2), 
+        "kategori_bmi": kategori_bmi,
+        "sistolik": sistolik, 
+        "diastolik": diastolik,
+        "kategori_tekanan_darah": kategori_tekanan_darah,
+        "riwayatPenyakit": riwayat_penyakit,
+        "riwayatMerokok": riwayat_merokok,
+        "aspekPsikologis": aspek_psikologis,
+        "diagnosis": diagnosis_result, 
+        "persentase": percentage, 
+        "risiko": risiko,
+        "gejala": symptoms, 
+        "saran": saran
+    }
+    
+    print("📤 Response yang dikirim ke frontend:", response_data)
+    return response_data, 200
+
 @app.route("/api/diagnosis", methods=["POST"])
 def diagnosis():
     try:
@@ -90,79 +358,15 @@ def diagnosis():
                 print(f"❌ Missing field: {field}")
                 return jsonify({"error": f"Missing required field: {field}"}), 400
             
-        # Ekstrak semua data
-        age = int(data["usia"])
-        gender_str = data["gender"]
-        weight = float(data["weight"])
-        height = float(data["height"])
-        sistolik = int(data["sistolik"])
-        diastolik = int(data["diastolik"])
-        riwayat_penyakit = data["riwayatPenyakit"]
-        riwayat_merokok = data["riwayatMerokok"]
-        aspek_psikologis = data["aspekPsikologis"]
-        symptoms = data["gejala"]
-
-        # Proses data
-        bmi = calculate_bmi(weight, height)
-        kategori_bmi = get_bmi_category(bmi)
-        kategori_tekanan_darah = klasifikasi_tekanan_darah(sistolik, diastolik)
-
-        print(f"🔍 DEBUG - Sistolik: {sistolik}, Diastolik: {diastolik}")
-        print(f"🔍 DEBUG - Kategori tekanan darah: {kategori_tekanan_darah}")
-        
-        diagnosis_result, percentage, risiko, saran = fuzzy_diagnosis(
-            age, gender_str, bmi, sistolik, diastolik, 
-            riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms
-        )
-
-        new_diagnosis = Diagnosa(
-            nama=data["nama"], 
-            usia=age, 
-            jenis_kelamin=gender_str,
-            berat_badan=weight, 
-            tinggi_badan=height, 
-            bmi=bmi, 
-            kategori_bmi=kategori_bmi,
-            sistolik=sistolik,
-            diastolik=diastolik,
-            kategori_tekanan_darah=kategori_tekanan_darah,
-            riwayat_penyakit=riwayat_penyakit,
-            riwayat_merokok=riwayat_merokok,
-            aspek_psikologis=aspek_psikologis,
-            diagnosis=diagnosis_result, 
-            persentase=percentage, 
-            risiko=risiko, 
-            saran=saran,
-            gejala=str(symptoms)
-        )
-        
-        db.session.add(new_diagnosis)
-        db.session.commit()
-
-        # Kirim response ke frontend
-        response_data = {
-            "nama": data["nama"], 
-            "usia": age, 
-            "gender": gender_str,
-            "weight": weight, 
-            "height": height, 
-            "bmi": round(bmi, 2), 
-            "kategori_bmi": kategori_bmi,
-            "sistolik": sistolik, 
-            "diastolik": diastolik,
-            "kategori_tekanan_darah": kategori_tekanan_darah,
-            "riwayatPenyakit": riwayat_penyakit,
-            "riwayatMerokok": riwayat_merokok,
-            "aspekPsikologis": aspek_psikologis,
-            "diagnosis": diagnosis_result, 
-            "persentase": percentage, 
-            "risiko": risiko,
-            "gejala": symptoms, 
-            "saran": saran
-        }
-        
-        print("📤 Response yang dikirim ke frontend:", response_data)
-        return jsonify(response_data)
+        key, payload_hash = idempotency_key(request, data)
+        result, replay = idempotency_store.run_once(key, payload_hash, lambda: proses_diagnosis(data))
+        response_data, status = result
+        if replay:
+            print("🔁 Kiriman ulang, mengembalikan hasil sebelumnya")
+        response = jsonify(response_data)
+        response.status_code = status
+        response.headers["Idempotent-Replay"] = "true" if replay else "false"
+        return response
     
     except Exception as e:
         db.session.rollback()
@@ -171,6 +375,7 @@ def diagnosis():
 
 # ENDPOINT STATISTIK HARIAN
 @app.route("/api/statistik-harian", methods=["GET"])
+@replica_router.read_only
 def statistik_harian():
     try:
         today = datetime.utcnow().date()
@@ -201,6 +406,7 @@ def statistik_harian():
 
 # DATA MASYARAKAT (DIAGNOSIS)
 @app.route("/api/data-masyarakat", methods=["GET"])
+@replica_router.read_only
 def get_all_diagnosis():
     try:
         data = Diagnosa.query.order_by(Diagnosa.id.desc()).all()
@@ -218,33 +424,75 @@ def get_all_diagnosis():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+EXPORT_FIELDS = [
+    "id", "nama", "usia", "jenis_kelamin", "berat_badan", "tinggi_badan", "bmi", "kategori_bmi",
+    "sistolik", "diastolik", "kategori_tekanan_darah", "riwayat_penyakit", "riwayat_merokok",
+    "aspek_psikologis", "diagnosis", "persentase", "risiko", "saran", "gejala", "created_at",
+]
+
+@app.route("/api/data-masyarakat/export", methods=["GET"])
+@replica_router.read_only
+def export_diagnosis():
+    """Export data hot dan arsip per rentang bulan (?dari=YYYY-MM&sampai=YYYY-MM&format=csv|ndjson)."""
+    try:
+        start = parse_month(request.args["dari"]) if request.args.get("dari") else None
+        end = add_months(parse_month(request.args["sampai"]), 1) if request.args.get("sampai") else None
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in ("csv", "ndjson"):
+            return jsonify({"error": "format harus csv atau ndjson"}), 400
+    except ValueError:
+        return jsonify({"error": "dari/sampai harus berformat YYYY-MM"}), 400
+
+    # Probe replica sebelum streaming dimulai agar kegagalannya masih diulang di
+    # primary oleh read_only. Kegagalan di tengah streaming tidak diulang; klien
+    # menerima file terpotong dan replica ditandai bermasalah.
+    try:
+        db.session.execute(select(Diagnosa.id).limit(1))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def records():
+        yield from arsip_store.iter_records(start, end)
+        # Hanya partisi hot yang masuk rentang yang dibaca
+        query = Diagnosa.query
+        if start:
+            query = query.filter(Diagnosa.created_at >= month_start(start))
+        if end:
+            query = query.filter(Diagnosa.created_at < end)
+        for row in query.order_by(Diagnosa.id).yield_per(500):
+            yield diagnosa_arsip(row)
+
+    def generate():
+        if fmt == "ndjson":
+            for record in records():
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for record in records():
+            writer.writerow(record)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return Response(stream_with_context(replica_router.stream(generate())), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=data-masyarakat.{fmt}"
+    })
+
 @app.route("/api/data-masyarakat/<int:id>", methods=["GET"])
+@replica_router.read_only
 def get_diagnosis_detail(id):
     try:
         data = Diagnosa.query.get(id)
         if data:
-            result = {
-                "id": data.id,
-                "nama": data.nama,
-                "usia": data.usia,
-                "jenis_kelamin": data.jenis_kelamin,
-                "berat_badan": data.berat_badan,
-                "tinggi_badan": data.tinggi_badan,
-                "bmi": data.bmi,
-                "kategori_bmi": data.kategori_bmi,
-                "sistolik": data.sistolik,
-                "diastolik": data.diastolik,
-                "kategori_tekanan_darah": data.kategori_tekanan_darah,
-                "riwayat_penyakit": data.riwayat_penyakit,
-                "riwayat_merokok": data.riwayat_merokok,
-                "aspek_psikologis": data.aspek_psikologis,
-                "diagnosis": data.diagnosis,
-                "persentase": data.persentase,
-                "risiko": data.risiko,
-                "saran": data.saran,
-                "gejala": data.gejala
-                }
-            return jsonify(result)
+            return jsonify(diagnosa_detail(data))
+        # Data lama mungkin sudah dipindah ke arsip
+        arsip = arsip_store.find(id)
+        if arsip:
+            arsip.pop("created_at", None)
+            return jsonify(arsip)
         return jsonify({"message": "Data tidak ditemukan"}), 404
 
     except Exception as e:
@@ -254,13 +502,32 @@ def get_diagnosis_detail(id):
 def delete_data(id):
     try:
         data = Diagnosa.query.get(id)
-        if data:
-            db.session.delete(data)
-            db.session.commit()
+        if not arsip_store.enabled or (data is not None and data.created_at >= pengarsip.cutoff()):
+            if data:
+                db.session.delete(data)
+                db.session.commit()
+                return jsonify({"message": "Berhasil dihapus"})
+            return jsonify({"message": "Data tidak ditemukan"}), 404
+
+        # Data lama bisa berada di arsip; hapus di keduanya tanpa bentrok dengan proses arsip
+        try:
+            with pengarsip.locked(timeout=10):
+                deleted = arsip_store.delete_record(id)
+                if data:
+                    db.session.delete(data)
+                    db.session.commit()
+                    deleted = True
+        except ArsipSibuk:
+            response = jsonify({"error": "Arsip sedang diproses, coba lagi nanti"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "30"
+            return response
+        if deleted:
             return jsonify({"message": "Berhasil dihapus"})
         return jsonify({"message": "Data tidak ditemukan"}), 404
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 # FEEDBACK
@@ -287,6 +554,7 @@ def create_feedback():
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/feedback", methods=["GET"])
+@replica_router.read_only
 def get_feedback():
     try:
         feedbacks = Feedback.query.order_by(Feedback.id.desc()).all()
@@ -310,6 +578,17 @@ def delete_feedback(id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# METRICS
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "db_pool": {name: stats.snapshot() for name, stats in pool_stats.items()},
+        "db_routing": replica_router.snapshot(),
+        "idempotency": idempotency_store.snapshot(),
+        "admission": admission_controller.snapshot(),
+        "shadow": shadow_scorer.snapshot(),
+    })
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -324,6 +603,7 @@ def init_db():
     try:
         with app.app_context():
             db.create_all()
+            hasil_katalog.seed()
             print("Database tables created successfully")
 
     except Exception as e:
@@ -0,0 +1,396 @@
+import gzip
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows (lingkungan dev)
+    fcntl = None
+    import msvcrt
+
+MANIFEST = "manifest.json"
+LOCK_FILE = ".lock"
+ADVISORY_LOCK = "arsip_diagnosa"
+
+
+class ArsipSibuk(RuntimeError):
+    """Arsip sedang dipakai proses atau host lain."""
+
+
+def _try_lock(f):
+    """Kunci eksklusif non-blocking pada file terbuka; False jika dipegang proses lain."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Helper bulan
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def month_key(value):
+    return value.strftime("%Y%m")
+
+
+def parse_month(value):
+    """'2026-01' atau '202601' -> datetime awal bulan."""
+    return datetime.strptime(value.replace("-", ""), "%Y%m")
+
+
+class MySQLPartitions:
+    """Partisi RANGE (TO_DAYS(created_at)) per bulan: p202601, ..., pmax."""
+
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+
+    def partitions(self, conn):
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+        ), {"table": self.table}).all()
+        return {row[0] for row in rows}
+
+    def ensure_partitions(self, months_ahead):
+        """Menambah partisi bulan berjalan dan beberapa bulan ke depan dari pmax."""
+        created = []
+        with self.engine.begin() as conn:
+            names = self.partitions(conn)
+            if "pmax" not in names:
+                return created  # Tabel belum dipartisi; jalankan migrasi dulu
+            current = month_start(datetime.utcnow())
+            for i in range(months_ahead + 1):
+                month = add_months(current, i)
+                name = f"p{month_key(month)}"
+                if name in names:
+                    continue
+                upper = add_months(month, 1).strftime("%Y-%m-%d")
+                conn.execute(text(
+                    f"ALTER TABLE {self.table} REORGANIZE PARTITION pmax INTO ("
+                    f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{upper}')), "
+                    f"PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                ))
+                created.append(name)
+        return created
+
+    def drop_month(self, month, archived_ids):
+        _delete_ids(self.engine, self.table, archived_ids)
+        name = f"p{month_key(month)}"
+        with self.engine.begin() as conn:
+            if name not in self.partitions(conn):
+                return
+            # Partisi yang sudah kosong dilepas agar ruangnya kembali
+            remaining = conn.execute(text(f"SELECT COUNT(*) FROM {self.table} PARTITION ({name})")).scalar()
+            if remaining == 0:
+                conn.execute(text(f"ALTER TABLE {self.table} DROP PARTITION {name}"))
+
+
+class RangePartitions:
+    """
+    Pengganti partisi untuk SQLite dan dialek lain. Ini bukan tabel per bulan:
+    diagnosa tetap satu tabel, satu "partisi" hanyalah rentang created_at pada
+    indeks, dan melepas partisi berarti DELETE baris yang sudah diarsipkan
+    (ruang file baru kembali setelah VACUUM). Query hot tetap hanya membaca
+    rentang bulan hot lewat indeks, tetapi tanpa partition pruning. Tabel per
+    bulan sengaja tidak dibuat karena model ORM dan semua endpoint membaca satu
+    tabel diagnosa; partisi sungguhan hanya ada di MySQL (MySQLPartitions).
+    """
+
+    def __init__(self, engine, table):
+        self.engine = engine
+        self.table = table
+
+    def ensure_partitions(self, months_ahead):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_created_at ON {self.table} (created_at)"
+            ))
+        return []
+
+    def drop_month(self, month, archived_ids):
+        _delete_ids(self.engine, self.table, archived_ids)
+
+
+def _delete_ids(engine, table, ids, batch=500):
+    ids = sorted(ids)
+    with engine.begin() as conn:
+        for i in range(0, len(ids), batch):
+            chunk = ids[i:i + batch]
+            params = {f"id{j}": value for j, value in enumerate(chunk)}
+            placeholders = ", ".join(f":id{j}" for j in range(len(chunk)))
+            conn.execute(text(f"DELETE FROM {table} WHERE id IN ({placeholders})"), params)
+
+
+def make_partitions(engine, table):
+    if engine.dialect.name == "mysql":
+        return MySQLPartitions(engine, table)
+    return RangePartitions(engine, table)
+
+
+@lru_cache(maxsize=4)
+def _load_archive_file(path, mtime):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return {record["id"]: record for record in map(json.loads, f)}
+
+
+class ArsipStore:
+    """
+    File arsip gzip NDJSON per bulan beserta manifest (bulan, rentang id, jumlah baris).
+
+    ARCHIVE_DIR harus penyimpanan yang tahan restart dan dipakai bersama semua
+    host (volume persisten / NFS), bukan filesystem sementara dyno PaaS: baris
+    yang diarsipkan sudah dihapus dari database. Perubahan manifest dan file
+    hanya boleh dilakukan di dalam lock().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST)
+
+    def manifest(self):
+        if not self.enabled or not os.path.exists(self._manifest_path()):
+            return []
+        with open(self._manifest_path()) as f:
+            return json.load(f)
+
+    @contextmanager
+    def lock(self, timeout=None):
+        """
+        Kunci file eksklusif di ARCHIVE_DIR (lintas proses di satu filesystem):
+        flock di POSIX, msvcrt.locking di Windows.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with open(os.path.join(self.directory, LOCK_FILE), "a+") as f:
+            while not _try_lock(f):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise ArsipSibuk("Arsip sedang dipakai proses lain")
+                time.sleep(0.1)
+            try:
+                yield
+            finally:
+                _unlock(f)
+
+    def _write_manifest(self, entries):
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._manifest_path())
+
+    def archived_ids(self, month):
+        ids = set()
+        for entry in self.manifest():
+            if entry["month"] == month_key(month):
+                ids.update(self._read(entry).keys())
+        return ids
+
+    def _write_file(self, month, records):
+        """Menulis record ke file arsip baru. Mengembalikan (entri manifest, id), entri None jika kosong."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"diagnosa_{month_key(month)}_{int(time.time())}_{uuid.uuid4().hex[:8]}.ndjson.gz"
+        path = os.path.join(self.directory, name)
+        tmp = path + ".tmp"
+        ids = []
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                ids.append(record["id"])
+        if not ids:
+            os.remove(tmp)
+            return None, ids
+        # Verifikasi sebelum data sumber dihapus
+        with gzip.open(tmp, "rt", encoding="utf-8") as f:
+            if sum(1 for _ in f) != len(ids):
+                raise IOError(f"Verifikasi arsip {name} gagal")
+        os.replace(tmp, path)
+        return {
+            "month": month_key(month),
+            "file": name,
+            "rows": len(ids),
+            "min_id": min(ids),
+            "max_id": max(ids),
+            "archived_at": datetime.utcnow().isoformat(),
+        }, ids
+
+    def write_month(self, month, records):
+        """Menulis record ke file arsip baru; manifest diperbarui setelah file lengkap."""
+        entry, ids = self._write_file(month, records)
+        if entry is None:
+            return []
+        entries = self.manifest()
+        entries.append(entry)
+        self._write_manifest(entries)
+        return ids
+
+    def delete_record(self, record_id):
+        """Menghapus satu record dari arsip dengan menulis ulang file bulannya."""
+        kept, removed = [], []
+        for entry in self.manifest():
+            if not entry["min_id"] <= record_id <= entry["max_id"] or record_id not in self._read(entry):
+                kept.append(entry)
+                continue
+            records = [r for r in self._read(entry).values() if r["id"] != record_id]
+            replacement, _ = self._write_file(parse_month(entry["month"]), records)
+            if replacement is not None:
+                replacement["archived_at"] = entry["archived_at"]
+                kept.append(replacement)
+            removed.append(entry["file"])
+        if not removed:
+            return False
+        self._write_manifest(kept)
+        for name in removed:
+            os.remove(os.path.join(self.directory, name))
+        return True
+
+    def _read(self, entry):
+        path = os.path.join(self.directory, entry["file"])
+        return _load_archive_file(path, os.path.getmtime(path))
+
+    def find(self, record_id):
+        for entry in self.manifest():
+            if entry["min_id"] <= record_id <= entry["max_id"]:
+                record = self._read(entry).get(record_id)
+                if record is not None:
+                    return dict(record)
+        return None
+
+    def iter_records(self, start=None, end=None):
+        """Record arsip untuk bulan [start, end), diurutkan per bulan lalu id."""
+        entries = sorted(self.manifest(), key=lambda e: (e["month"], e["min_id"]))
+        for entry in entries:
+            month = parse_month(entry["month"])
+            if (start and month < month_start(start)) or (end and month >= end):
+                continue
+            path = os.path.join(self.directory, entry["file"])
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+class Pengarsip:
+    """Menyiapkan partisi dan memindahkan bulan di luar jendela hot ke arsip."""
+
+    def __init__(self, db, model, serialize, store, hot_months=12, months_ahead=3):
+        self.db = db
+        self.model = model
+        self.serialize = serialize
+        self.store = store
+        self.hot_months = hot_months
+        self.months_ahead = months_ahead
+
+    def _partitions(self):
+        return make_partitions(self.db.engine, self.model.__tablename__)
+
+    def cutoff(self, now=None):
+        return add_months(month_start(now or datetime.utcnow()), -(self.hot_months - 1))
+
+    def ensure_partitions(self):
+        return self._partitions().ensure_partitions(self.months_ahead)
+
+    @contextmanager
+    def locked(self, timeout=0):
+        """
+        Satu siklus arsip atau hapus pada satu waktu: advisory lock MySQL
+        (lintas host) lalu kunci file ARCHIVE_DIR. Melempar ArsipSibuk jika
+        tidak didapat dalam timeout detik.
+        """
+        engine = self.db.engine
+        if engine.dialect.name != "mysql":
+            with self._store_lock(timeout):
+                yield
+            return
+        with engine.connect() as conn:
+            got = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                               {"name": ADVISORY_LOCK, "timeout": int(timeout)}).scalar()
+            if got != 1:
+                raise ArsipSibuk("Arsip sedang dipakai host lain")
+            try:
+                with self._store_lock(timeout):
+                    yield
+            finally:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": ADVISORY_LOCK})
+
+    @contextmanager
+    def _store_lock(self, timeout):
+        if not self.store.enabled:
+            yield
+            return
+        with self.store.lock(timeout):
+            yield
+
+    def archive(self, now=None):
+        """
+        Mengarsipkan semua bulan sebelum cutoff. Mengembalikan {bulan: jumlah baris}.
+        Pemanggil memegang locked().
+        """
+        if not self.store.enabled:
+            return {}
+        model = self.model
+        cutoff = self.cutoff(now)
+        oldest = self.db.session.query(self.db.func.min(model.created_at)).filter(model.created_at < cutoff).scalar()
+        self.db.session.rollback()
+        if oldest is None:
+            return {}
+
+        partitions = self._partitions()
+        result = {}
+        month = month_start(oldest)
+        while month < cutoff:
+            upper = add_months(month, 1)
+            already = self.store.archived_ids(month)
+            query = (model.query
+                     .filter(model.created_at >= month, model.created_at < upper)
+                     .order_by(model.id)
+                     .yield_per(1000))
+            records = (self.serialize(row) for row in query if row.id not in already)
+            ids = self.store.write_month(month, records)
+            self.db.session.rollback()
+            archived = already | set(ids)
+            if archived:
+                partitions.drop_month(month, archived)
+            result[month_key(month)] = len(ids)
+            month = upper
+        return result
+
+    def run(self, now=None):
+        with self.locked():
+            created = self.ensure_partitions()
+            archived = self.archive(now)
+        if created or any(archived.values()):
+            print(f"🗄️  Partisi baru: {created}, diarsipkan: {archived}")
+        return created, archived
@@ -0,0 +1,398 @@
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Default bawaan SQLAlchemy QueuePool
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+# Default gunicorn; gunicorn.conf.py, admission.py, dan idempotency.py memakai nilai ini
+DEFAULT_THREADS = 4
+DEFAULT_WORKER_TIMEOUT = 120
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def get_threads():
+    """Jumlah thread per worker gunicorn (GUNICORN_THREADS)."""
+    return max(1, _env_int("GUNICORN_THREADS", DEFAULT_THREADS))
+
+
+def get_worker_timeout():
+    """Batas waktu request sebelum worker dibunuh gunicorn (GUNICORN_TIMEOUT)."""
+    return max(1, _env_int("GUNICORN_TIMEOUT", DEFAULT_WORKER_TIMEOUT))
+
+
+def normalize_database_url(url):
+    """Memastikan URL MySQL memakai driver PyMySQL."""
+    if url and url.startswith("mysql://"):
+        return url.replace("mysql://", "mysql+pymysql://", 1)
+    return url
+
+
+def _is_sqlite_memory(url):
+    return url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///") or ":memory:" in url)
+
+
+def get_pre_ping_strategy():
+    """Strategi pre-ping: 'always', 'idle', atau 'off' (DB_POOL_PRE_PING)."""
+    value = os.environ.get("DB_POOL_PRE_PING", "always").strip().lower()
+    if value in ("1", "true", "yes", "always"):
+        return "always"
+    if value in ("0", "false", "no", "off", "none"):
+        return "off"
+    if value == "idle":
+        return "idle"
+    raise ValueError(f"DB_POOL_PRE_PING tidak dikenal: {value}")
+
+
+def compute_pool_size(workers=None, threads=None):
+    """
+    Menentukan pool_size dan max_overflow per worker gunicorn.
+    Jika DB_MAX_CONNECTIONS diset, batas koneksi dibagi rata ke semua worker
+    sehingga total koneksi tidak melebihi batas MySQL. Pada worker gthread,
+    pool_size minimal sebanyak GUNICORN_THREADS agar thread tidak saling menunggu.
+    """
+    if workers is None:
+        workers = _env_int("WEB_CONCURRENCY", 1)
+    workers = max(1, workers)
+    threads = get_threads() if threads is None else max(1, threads)
+
+    budget = _env_int("DB_MAX_CONNECTIONS", 0)
+    if budget > 0:
+        per_worker = max(1, budget // workers)
+        default_size = min(per_worker, max(threads, per_worker // 2))
+        default_overflow = per_worker - default_size
+    else:
+        default_size, default_overflow = max(DEFAULT_POOL_SIZE, threads), DEFAULT_MAX_OVERFLOW
+
+    pool_size = _env_int("DB_POOL_SIZE", default_size)
+    max_overflow = _env_int("DB_MAX_OVERFLOW", default_overflow)
+    if pool_size + max(0, max_overflow) < threads:
+        print(f"⚠️  Pool DB ({pool_size} + {max_overflow} overflow) lebih kecil dari {threads} thread per worker")
+    return pool_size, max_overflow
+
+
+def build_engine_options(url):
+    """Menyusun SQLALCHEMY_ENGINE_OPTIONS dari environment."""
+    strategy = get_pre_ping_strategy()
+    options = {
+        'pool_pre_ping': strategy == "always",
+        'pool_recycle': _env_int("DB_POOL_RECYCLE", 300),
+    }
+    if _is_sqlite_memory(url):
+        return options
+
+    pool_size, max_overflow = compute_pool_size()
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': _env_float("DB_POOL_TIMEOUT", 30),
+    })
+    return options
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool yang mencatat lama menunggu koneksi saat checkout. Waktu membuka
+    koneksi baru (overflow) dicatat terpisah agar tidak terhitung sebagai antre.
+    """
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        record = super()._create_connection()
+        record.info['pool_connect'] = time.perf_counter() - start
+        return record
+
+    def _do_get(self):
+        start = time.perf_counter()
+        record = super()._do_get()
+        elapsed = time.perf_counter() - start
+        connect = record.info.pop('pool_connect', 0.0)
+        record.info['pool_wait'] = max(0.0, elapsed - connect)
+        record.info['pool_connect_time'] = connect
+        return record
+
+
+class PoolStats:
+    """Telemetri pool koneksi: checkout, waktu tunggu, overflow, invalidasi."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.engine = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.overflow_checkouts = 0
+            self.peak_overflow = 0
+            self.invalidations = 0
+            self.soft_invalidations = 0
+            self.idle_pings = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.connect_total = 0.0
+            self.connect_max = 0.0
+
+    def attach(self, engine, ping_idle_after=None):
+        """Memasang listener event pada pool milik engine."""
+        self.engine = engine
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'soft_invalidate', self._on_soft_invalidate)
+        if ping_idle_after is not None:
+            event.listen(engine, 'checkout', self._make_idle_ping(ping_idle_after))
+        return self
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        wait = connection_record.info.pop('pool_wait', 0.0)
+        connect = connection_record.info.pop('pool_connect_time', 0.0)
+        pool = self.engine.pool
+        overflow = pool.overflow() if isinstance(pool, QueuePool) else 0
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.connect_total += connect
+            self.connect_max = max(self.connect_max, connect)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        connection_record.info['last_checkin'] = time.monotonic()
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.soft_invalidations += 1
+
+    def _make_idle_ping(self, idle_after):
+        def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+            last = connection_record.info.get('last_checkin')
+            if last is None or time.monotonic() - last < idle_after:
+                return
+            with self._lock:
+                self.idle_pings += 1
+            try:
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute("SELECT 1")
+                finally:
+                    cursor.close()
+            except Exception:
+                # Pool akan membuang koneksi ini dan membuka yang baru
+                raise exc.DisconnectionError()
+        return ping_if_idle
+
+    def snapshot(self):
+        with self._lock:
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "overflow_checkouts": self.overflow_checkouts,
+                "peak_overflow": self.peak_overflow,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "idle_pings": self.idle_pings,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "connect_total_ms": round(self.connect_total * 1000, 3),
+                "connect_max_ms": round(self.connect_max * 1000, 3),
+            }
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "timeout": pool.timeout(),
+            })
+        return data
+
+
+def attach_pool_stats(engine, name):
+    """Membuat PoolStats untuk engine sesuai strategi pre-ping yang aktif."""
+    ping_idle_after = None
+    if get_pre_ping_strategy() == "idle":
+        ping_idle_after = _env_float("DB_POOL_PING_IDLE", 30)
+    return PoolStats(name).attach(engine, ping_idle_after=ping_idle_after)
+
+
+# READ REPLICA
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "db_sticky_until"
+STICKY_HEADER = "X-DB-Sticky-Until"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class RoutingSession(Session):
+    """Session yang mengarahkan query baca ke replica selama route read-only."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context()
+                and g.get('db_read_replica') and REPLICA_BIND in self._db.engines):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Pemisahan baca/tulis: route GET membaca dari DATABASE_READ_URL, kecuali
+    klien baru saja menulis (read-your-writes) atau replica sedang bermasalah.
+
+    Setelah tulis, response membawa token sticky di header X-DB-Sticky-Until
+    (untuk dikirim balik oleh frontend) dan cookie SameSite=None; Secure
+    (untuk fetch dengan credentials). Token ada di sisi klien sehingga berlaku
+    di worker mana pun.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.enabled = False
+        self.sticky_seconds = 5.0
+        self.cooldown_seconds = 30.0
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.fallbacks = 0
+
+    def init_app(self, app, db):
+        self.db = db
+        self.enabled = REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+        self.sticky_seconds = _env_float("DB_READ_STICKY_SECONDS", 5)
+        self.cooldown_seconds = _env_float("DB_READ_COOLDOWN_SECONDS", 30)
+        app.after_request(self._after_request)
+        if self.enabled:
+            with app.app_context():
+                event.listen(db.engines[REPLICA_BIND], 'handle_error', self._on_replica_error)
+
+    def _after_request(self, response):
+        # Bacaan klien berikutnya tetap ke primary sampai token kedaluwarsa
+        if not self.enabled or request.method not in WRITE_METHODS or response.status_code >= 400:
+            return response
+        token = f"{time.time() + self.sticky_seconds:.3f}"
+        response.headers[STICKY_HEADER] = token
+        response.set_cookie(STICKY_COOKIE, token, max_age=int(self.sticky_seconds) + 1,
+                            httponly=True, secure=True, samesite="None")
+        return response
+
+    def _is_sticky(self):
+        now = time.time()
+        for value in (request.headers.get(STICKY_HEADER), request.cookies.get(STICKY_COOKIE)):
+            try:
+                if value and float(value) > now:
+                    return True
+            except ValueError:
+                pass
+        return False
+
+    def _on_replica_error(self, context):
+        if context.is_disconnect or isinstance(context.original_exception, exc.OperationalError) \
+                or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            with self._lock:
+                self._down_until = time.monotonic() + self.cooldown_seconds
+            if has_app_context():
+                g.db_replica_failed = True
+
+    def replica_available(self):
+        with self._lock:
+            return time.monotonic() >= self._down_until
+
+    def read_only(self, view):
+        """Dekorator untuk route yang hanya membaca data."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or not self.replica_available():
+                self._count('primary_reads')
+                return view(*args, **kwargs)
+            if self._is_sticky():
+                self._count('sticky_reads')
+                return view(*args, **kwargs)
+
+            g.db_read_replica = True
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                g.db_read_replica = False
+
+            if g.pop('db_replica_failed', False):
+                # Replica gagal: ulangi di primary
+                self.db.session.rollback()
+                self.db.session.close()
+                self._count('fallbacks')
+                return view(*args, **kwargs)
+            self._count('replica_reads')
+            return response
+        return wrapper
+
+    def stream(self, generator):
+        """
+        Generator response streaming berjalan setelah view selesai; bawa pilihan
+        replica dari read_only agar query di dalamnya tetap ke replica.
+        """
+        use_replica = bool(g.get('db_read_replica'))
+
+        def wrapped():
+            g.db_read_replica = use_replica
+            try:
+                yield from generator
+            finally:
+                g.db_read_replica = False
+        return wrapped()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "replica_available": time.monotonic() >= self._down_until,
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "sticky_reads": self.sticky_reads,
+                "fallbacks": self.fallbacks,
+            }
+
+
+replica_router = ReplicaRouter()
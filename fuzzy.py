@@ -1,3 +1,6 @@
+import os
+from functools import lru_cache
+
 import numpy as np
 from utils import gaussian_membership, get_skor_tekanan_darah, format_diagnosis_result
 
@@ -55,14 +58,25 @@ GEJALA_WEIGHTS = {
     'pusing': 0.4
 }
 
-def fuzzifikasi_gejala(symptoms):
+def fuzzifikasi_gejala(symptoms, gejala_weights=None):
+    gejala_weights = gejala_weights or GEJALA_WEIGHTS
     symptoms = normalize_symptom_keys(symptoms)
-    base_fuzzy = {key: 1.0 if symptoms.get(key, "tidak") == "ya" else 0.0 for key in GEJALA_WEIGHTS}
-    fuzzy_weighted = {key: base_fuzzy[key] * GEJALA_WEIGHTS[key] for key in base_fuzzy}
+    base_fuzzy = {key: 1.0 if symptoms.get(key, "tidak") == "ya" else 0.0 for key in gejala_weights}
+    fuzzy_weighted = {key: base_fuzzy[key] * gejala_weights[key] for key in base_fuzzy}
     return fuzzy_weighted, base_fuzzy
 
-def inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_darah_fuzzy, riwayat_fuzzy):
+#Bobot output tiap rule (nomor rule -> pengali kekuatan)
+#Rule 17-20 (default dan fallback) tidak punya premis fuzzy, bobotnya langsung menjadi kekuatan
+RULE_WEIGHTS = {
+    1: 0.95, 2: 0.9, 3: 0.85, 4: 0.9, 5: 0.85, 6: 0.8,
+    7: 0.8, 8: 0.75, 9: 0.7, 10: 0.6, 11: 0.65, 12: 0.6,
+    13: 0.5, 14: 0.6, 15: 0.55, 16: 0.4,
+    17: 0.3, 18: 1.0, 19: 0.3, 20: 0.5,
+}
+
+def inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_darah_fuzzy, riwayat_fuzzy, rule_weights=None):
     rules = []
+    w = rule_weights or RULE_WEIGHTS
     
     # Definisi variabel untuk kemudahan
     gejala_mayor = max(gejala_fuzzy['nyeri_dada'], gejala_fuzzy['sesak_napas'])
@@ -80,36 +94,36 @@ def inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_d
     
     # Rule 1: Sindrom Koroner Akut (chest pain + cold sweat)
     if chest_pain_syndrome > 0.5:
-        rules.append(('tinggi', 0.95))
+        rules.append(('tinggi', w[1]))
     
     # Rule 2: Nyeri dada pada usia berisiko tinggi
     if gejala_fuzzy['nyeri_dada'] > 0 and (age_fuzzy['dewasa'] > 0.7 or age_fuzzy['lansia'] > 0.3):
         strength = min(gejala_fuzzy['nyeri_dada'], max(age_fuzzy['dewasa'] * 0.7, age_fuzzy['lansia']))
-        rules.append(('tinggi', strength * 0.9))
+        rules.append(('tinggi', strength * w[2]))
     
     # Rule 3: Multiple major symptoms
     if gejala_fuzzy['nyeri_dada'] > 0 and gejala_fuzzy['sesak_napas'] > 0:
         strength = min(gejala_fuzzy['nyeri_dada'], gejala_fuzzy['sesak_napas'])
-        rules.append(('tinggi', strength * 0.85))
+        rules.append(('tinggi', strength * w[3]))
     
     # Rule 4: Riwayat penyakit + gejala mayor
     if riwayat_fuzzy['penyakit'] > 0 and gejala_mayor > 0.3:
-        rules.append(('tinggi', min(1.0, gejala_mayor * 1.2) * 0.9))
+        rules.append(('tinggi', min(1.0, gejala_mayor * 1.2) * w[4]))
     
     # Rule 5: Hipertensi berat + gejala
     if tekanan_darah_fuzzy['sangat_tinggi'] > 0.6 and (gejala_mayor > 0 or gejala_minor > 0):
         strength = min(tekanan_darah_fuzzy['sangat_tinggi'], max(gejala_mayor, gejala_minor))
-        rules.append(('tinggi', strength * 0.85))
+        rules.append(('tinggi', strength * w[5]))
     
     # Rule 6: Sindrom gagal jantung
     if heart_failure_syndrome > 0.4:
-        rules.append(('tinggi', heart_failure_syndrome * 0.8))
+        rules.append(('tinggi', heart_failure_syndrome * w[6]))
 
     # --- ATURAN RISIKO SEDANG (Intermediate Risk) ---
     
     # Rule 7: Angina pada aktivitas (chest pain + fatigue)
     if angina_syndrome > 0.3:
-        rules.append(('sedang', angina_syndrome * 0.8))
+        rules.append(('sedang', angina_syndrome * w[7]))
     
     # Rule 8: Faktor risiko multipel tanpa gejala mayor
     faktor_risiko = (riwayat_fuzzy['merokok'] + 
@@ -117,66 +131,67 @@ def inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_d
                     max(tekanan_darah_fuzzy['tinggi'], tekanan_darah_fuzzy['sangat_tinggi']))
     if faktor_risiko >= 2 and gejala_minor > 0:
         strength = min(faktor_risiko / 3, 1.0) * max(gejala_minor, 0.3)
-        rules.append(('sedang', strength * 0.75))
+        rules.append(('sedang', strength * w[8]))
     
     # Rule 9: Obesitas + hipertensi + gejala
     if (bmi_fuzzy['obese'] > 0.5 and tekanan_darah_fuzzy['tinggi'] > 0.5 and 
         (gejala_fuzzy['bengkak_kaki'] > 0 or gejala_fuzzy['sesak_napas'] > 0)):
         strength = min(bmi_fuzzy['obese'], tekanan_darah_fuzzy['tinggi'])
-        rules.append(('sedang', strength * 0.7))
+        rules.append(('sedang', strength * w[9]))
     
     # Rule 10: Palpitasi + faktor psikologis + faktor risiko lain
     if (gejala_fuzzy['jantung_berdebar'] > 0.5 and riwayat_fuzzy['psikologis_berat'] > 0 and
         (riwayat_fuzzy['merokok'] > 0 or tekanan_darah_fuzzy['tinggi'] > 0.3)):
-        rules.append(('sedang', 0.6))
+        rules.append(('sedang', w[10]))
     
     # Rule 11: Multiple minor symptoms
     if jumlah_gejala_aktif >= 3 and gejala_mayor == 0 and gejala_minor > 0.5:
-        rules.append(('sedang', 0.65))
+        rules.append(('sedang', w[11]))
     
     # Rule 12: Usia lanjut + gejala non-spesifik + faktor risiko
     if (age_fuzzy['lansia'] > 0.6 and gejala_non_spesifik > 0 and
         (riwayat_fuzzy['merokok'] > 0 or tekanan_darah_fuzzy['tinggi'] > 0)):
         strength = age_fuzzy['lansia'] * 0.8
-        rules.append(('sedang', strength * 0.6))
+        rules.append(('sedang', strength * w[12]))
 
     # --- ATURAN RISIKO RENDAH (Low Risk) ---
     
     # Rule 13: Gejala non-spesifik pada usia muda dengan BMI normal
     if (gejala_non_spesifik > 0 and age_fuzzy['dewasa'] < 0.5 and 
         bmi_fuzzy['normal'] > 0.5 and not any(riwayat_fuzzy.values())):
-        rules.append(('rendah', 0.5))
+        rules.append(('rendah', w[13]))
     
     # Rule 14: Single minor symptom tanpa faktor risiko
     if (jumlah_gejala_aktif == 1 and gejala_mayor == 0 and 
         not any(riwayat_fuzzy.values()) and tekanan_darah_fuzzy['normal'] > 0.5):
-        rules.append(('rendah', 0.6))
+        rules.append(('rendah', w[14]))
     
     # Rule 15: Palpitasi isolated dengan stress
     if (gejala_fuzzy['jantung_berdebar'] > 0.5 and jumlah_gejala_aktif <= 2 and
         riwayat_fuzzy['psikologis_berat'] > 0 and gejala_mayor == 0):
-        rules.append(('rendah', 0.55))
+        rules.append(('rendah', w[15]))
     
     # Rule 16: Fatigue isolated pada kondisi normal
     if (gejala_fuzzy['mudah_lelah'] > 0.5 and jumlah_gejala_aktif <= 2 and
         tekanan_darah_fuzzy['normal'] > 0.5 and bmi_fuzzy['normal'] > 0.3):
-        rules.append(('rendah', 0.4))
+        rules.append(('rendah', w[16]))
 
     # --- ATURAN DEFAULT ---
     
-    # Rule 17: Tidak ada gejala
+    # Rule 17: Tidak ada gejala, masih ada faktor risiko
+    # Rule 18: Tidak ada gejala maupun faktor risiko
     if jumlah_gejala_aktif == 0:
         if any(riwayat_fuzzy.values()) or tekanan_darah_fuzzy['tinggi'] > 0.5:
-            rules.append(('rendah', 0.3))  # Masih ada faktor risiko
+            rules.append(('rendah', w[17]))
         else:
-            rules.append(('tidak_terdeteksi', 1.0))
+            rules.append(('tidak_terdeteksi', w[18]))
     
-    # Fallback jika tidak ada rule yang terpicu
+    # Rule 19/20: Fallback jika tidak ada rule yang terpicu
     if not rules:
         if jumlah_gejala_aktif > 0:
-            rules.append(('rendah', 0.3))
+            rules.append(('rendah', w[19]))
         else:
-            rules.append(('tidak_terdeteksi', 0.5))
+            rules.append(('tidak_terdeteksi', w[20]))
             
     return rules
 
@@ -188,9 +203,11 @@ def agregasi_output(rules):
             aggregated[kategori] = max(aggregated[kategori], strength)
     return aggregated
 
+RISIKO_PARAMS = {'rendah': {'mean': 25, 'std': 15}, 'sedang': {'mean': 55, 'std': 15}, 'tinggi': {'mean': 85, 'std': 10}}
+
 def defuzzifikasi_centroid(aggregated):
     if aggregated.get('tidak_terdeteksi') == 1.0: return 0
-    risiko_params = {'rendah': {'mean': 25, 'std': 15}, 'sedang': {'mean': 55, 'std': 15}, 'tinggi': {'mean': 85, 'std': 10}}
+    risiko_params = RISIKO_PARAMS
     x_range = np.arange(0, 101, 1)
     output_membership = np.zeros_like(x_range, dtype=float)
     for kategori, strength in aggregated.items():
@@ -201,19 +218,95 @@ def defuzzifikasi_centroid(aggregated):
     if np.sum(output_membership) == 0: return 0
     return np.sum(x_range * output_membership) / np.sum(output_membership)
 
-def fuzzy_diagnosis(age, gender, bmi, sistolik, diastolik, riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms):
+@lru_cache(maxsize=None)
+def _universe(step):
+    """Universe 0-100 dan membership tiap kategori risiko, dihitung sekali per resolusi."""
+    x_range = np.arange(0, 100 + step / 2, step)
+    memberships = {
+        kategori: np.exp(-0.5 * ((x_range - p['mean']) / p['std']) ** 2)
+        for kategori, p in RISIKO_PARAMS.items()
+    }
+    return x_range, memberships
+
+def _output_membership(aggregated, step):
+    x_range, memberships = _universe(step)
+    output_membership = np.zeros_like(x_range)
+    for kategori, strength in aggregated.items():
+        if kategori in memberships and strength > 0:
+            np.maximum(output_membership, np.minimum(memberships[kategori], strength), out=output_membership)
+    return x_range, output_membership
+
+def defuzzifikasi_centroid_grid(aggregated, step=1.0):
+    """Centroid dengan universe beresolusi `step` (vektorisasi numpy)."""
+    if aggregated.get('tidak_terdeteksi') == 1.0: return 0
+    x_range, output_membership = _output_membership(aggregated, step)
+    total = output_membership.sum()
+    if total == 0: return 0
+    return float(np.dot(x_range, output_membership) / total)
+
+def defuzzifikasi_mean_of_maxima(aggregated, step=1.0):
+    """Rata-rata titik universe dengan derajat keanggotaan maksimum."""
+    if aggregated.get('tidak_terdeteksi') == 1.0: return 0
+    x_range, output_membership = _output_membership(aggregated, step)
+    peak = output_membership.max()
+    if peak == 0: return 0
+    return float(x_range[output_membership >= peak - 1e-12].mean())
+
+def defuzzifikasi_weighted_gaussian(aggregated):
+    """
+    Centroid tertutup: rata-rata mean kategori dengan bobot strength * std
+    (sebanding dengan luas Gaussian). Tanpa universe diskret.
+    """
+    if aggregated.get('tidak_terdeteksi') == 1.0: return 0
+    num = den = 0.0
+    for kategori, strength in aggregated.items():
+        if kategori in RISIKO_PARAMS and strength > 0:
+            weight = strength * RISIKO_PARAMS[kategori]['std']
+            num += weight * RISIKO_PARAMS[kategori]['mean']
+            den += weight
+    if den == 0: return 0
+    return num / den
+
+# Strategi defuzzifikasi yang bisa dipilih lewat DEFUZZIFIKASI_METHOD
+DEFUZZIFIKASI_METHODS = {
+    'centroid': defuzzifikasi_centroid,
+    'centroid_grid_1': lambda agg: defuzzifikasi_centroid_grid(agg, 1.0),
+    'centroid_grid_0.1': lambda agg: defuzzifikasi_centroid_grid(agg, 0.1),
+    'centroid_grid_2': lambda agg: defuzzifikasi_centroid_grid(agg, 2.0),
+    'centroid_grid_5': lambda agg: defuzzifikasi_centroid_grid(agg, 5.0),
+    'centroid_grid_10': lambda agg: defuzzifikasi_centroid_grid(agg, 10.0),
+    'mean_of_maxima': defuzzifikasi_mean_of_maxima,
+    'weighted_gaussian': defuzzifikasi_weighted_gaussian,
+}
+
+DEFUZZIFIKASI_METHOD = os.environ.get('DEFUZZIFIKASI_METHOD', 'centroid')
+if DEFUZZIFIKASI_METHOD not in DEFUZZIFIKASI_METHODS:
+    raise ValueError(f"DEFUZZIFIKASI_METHOD tidak dikenal: {DEFUZZIFIKASI_METHOD}")
+
+def defuzzifikasi(aggregated, method=None):
+    return DEFUZZIFIKASI_METHODS[method or DEFUZZIFIKASI_METHOD](aggregated)
+
+def fuzzy_aggregated(age, gender, bmi, sistolik, diastolik, riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms,
+                     gejala_weights=None, rule_weights=None):
+    """Fuzzifikasi, inferensi, dan agregasi; menghasilkan derajat tiap kategori risiko."""
     skor_td = get_skor_tekanan_darah(sistolik, diastolik, age, gender)
     
     age_fuzzy = fuzzifikasi_usia(age)
     bmi_fuzzy = fuzzifikasi_bmi(bmi)
-    gejala_fuzzy, gejala_base = fuzzifikasi_gejala(symptoms)
+    gejala_fuzzy, gejala_base = fuzzifikasi_gejala(symptoms, gejala_weights)
     tekanan_darah_fuzzy = fuzzifikasi_tekanan_darah(skor_td)
     riwayat_fuzzy = fuzzifikasi_riwayat(riwayat_penyakit, riwayat_merokok, aspek_psikologis)
 
-    rules_output = inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_darah_fuzzy, riwayat_fuzzy)
+    rules_output = inference_mamdani(age_fuzzy, bmi_fuzzy, gejala_fuzzy, gejala_base, tekanan_darah_fuzzy, riwayat_fuzzy, rule_weights)
     
-    aggregated = agregasi_output(rules_output)
-    centroid_score = defuzzifikasi_centroid(aggregated)
+    return agregasi_output(rules_output)
+
+def fuzzy_diagnosis(age, gender, bmi, sistolik, diastolik, riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms, method=None):
+    aggregated = fuzzy_aggregated(
+        age, gender, bmi, sistolik, diastolik,
+        riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms
+    )
+    centroid_score = defuzzifikasi(aggregated, method)
     
     result = format_diagnosis_result(centroid_score)
     result_score = round(centroid_score, 2)
@@ -1,9 +1,24 @@
 import os
 
+from database import get_threads, get_worker_timeout
+
 bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
 workers = int(os.environ.get('WEB_CONCURRENCY', 1))
-timeout = 120
+# gthread agar baca dashboard tidak antre di belakang intake (lihat admission.py)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = get_threads()
+timeout = get_worker_timeout()
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 100
-preload_app = True
\ No newline at end of file
+preload_app = True
+
+def post_fork(server, worker):
+    # Koneksi yang dibuka master (preload_app) tidak boleh dipakai bersama antar worker
+    from app import app, db, pool_stats
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    for stats in pool_stats.values():
+        stats.reset()
+
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from admission import client_key
+from database import get_worker_timeout
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def normalize_payload(value):
+    """Menormalkan payload agar kiriman ulang yang sama menghasilkan hash yang sama."""
+    if isinstance(value, dict):
+        return {str(k).strip(): normalize_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(v) for v in value]
+    if value is None:
+        return None
+    return str(value).strip()
+
+
+def _sha256(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def idempotency_key(request, data):
+    """
+    Mengembalikan (kunci, hash payload). Kunci berasal dari header
+    Idempotency-Key atau dari hash payload, selalu dibatasi per klien.
+    """
+    body = json.dumps(normalize_payload(data), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    payload_hash = _sha256(body)
+    header = request.headers.get(IDEMPOTENCY_HEADER)
+    if header:
+        raw = f"{request.path}:{client_key()}:key:{header.strip()}"
+    else:
+        raw = f"{request.path}:{client_key()}:body:{payload_hash}"
+    return _sha256(raw), payload_hash
+
+
+class IdempotencyStore:
+    """
+    Hasil request per kunci idempotensi di tabel database (primary key unik),
+    sehingga kiriman ganda tetap diproses sekali walau jatuh ke worker atau
+    host berbeda. Baris berstatus NULL sedang diproses; request lain dengan
+    kunci yang sama menunggu hasilnya dengan polling SELECT.
+    """
+
+    POLL_INTERVAL = 0.05
+    MAX_POLL_INTERVAL = 1.0
+    EVICT_INTERVAL = 60
+
+    def __init__(self, db, table, ttl=None, wait_timeout=None, max_entries=None):
+        self.db = db
+        self.table = table
+        self.ttl = float(os.environ.get("IDEMPOTENCY_TTL", 600)) if ttl is None else ttl
+        self.wait_timeout = float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", 30)) if wait_timeout is None else wait_timeout
+        self.max_entries = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000)) if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+        self.hits = 0
+        self.collapsed = 0
+        self.misses = 0
+        self.conflicts = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def lease(self):
+        # Klaim baru kedaluwarsa setelah worker pemiliknya pasti sudah dibunuh
+        # gunicorn, agar proses yang mati tidak menahan kunci selamanya
+        return timedelta(seconds=get_worker_timeout() + self.wait_timeout)
+
+    def _claim(self, key, payload_hash):
+        """
+        Mencoba menjadi pemilik kunci. Mengembalikan (token pemilik, baris yang
+        sudah ada); token None jika kunci dipegang request lain.
+        """
+        t = self.table
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(insert(t).values(
+                    kunci=key, payload_hash=payload_hash, pemilik=token,
+                    created_at=now, expires_at=now + self.lease))
+            return token, None
+        except IntegrityError:
+            pass
+        with self.db.engine.begin() as conn:
+            row = conn.execute(select(t).where(t.c.kunci == key)).first()
+            if row is not None and row.expires_at <= now:
+                conn.execute(delete(t).where(t.c.kunci == key, t.c.pemilik == row.pemilik))
+                row = None
+        return None, row
+
+    def _get(self, key):
+        """Baris kunci yang masih berlaku, atau None."""
+        with self.db.engine.connect() as conn:
+            row = conn.execute(select(self.table).where(self.table.c.kunci == key)).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row
+
+    def _finish(self, key, token, result):
+        # Hanya baris milik klaim ini; klaim yang sudah diambil alih tidak ditimpa
+        t = self.table
+        response_data, status = result
+        with self.db.engine.begin() as conn:
+            if status == 200:
+                conn.execute(update(t).where(t.c.kunci == key, t.c.pemilik == token).values(
+                    status=status,
+                    response=json.dumps(response_data, ensure_ascii=False),
+                    expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+                ))
+            else:
+                conn.execute(delete(t).where(t.c.kunci == key, t.c.pemilik == token))
+
+    def _release(self, key, token):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.kunci == key, t.c.pemilik == token))
+
+    def run_once(self, key, payload_hash, func):
+        """
+        Menjalankan func() sekali per kunci selama TTL.
+        Mengembalikan (hasil, replay); hasil hanya disimpan jika status 200.
+        Kunci yang sama dengan payload berbeda ditolak dengan 422.
+        """
+        if not self.enabled:
+            return func(), False
+
+        deadline = time.monotonic() + self.wait_timeout
+        delay = self.POLL_INTERVAL
+        waited = False
+        row = None
+        while True:
+            if row is None:
+                token, row = self._claim(key, payload_hash)
+                if token:
+                    break
+                if row is None:
+                    continue  # Pemilik gagal atau kedaluwarsa; coba klaim lagi
+            if row.payload_hash != payload_hash:
+                self._count('conflicts')
+                return ({"error": "Idempotency-Key sudah dipakai untuk data yang berbeda"}, 422), False
+            if row.status is not None:
+                self._count('collapsed' if waited else 'hits')
+                return (json.loads(row.response), row.status), True
+            if time.monotonic() >= deadline:
+                return ({"error": "Permintaan yang sama masih diproses, coba lagi nanti"}, 409), False
+            waited = True
+            time.sleep(delay)
+            delay = min(delay * 2, self.MAX_POLL_INTERVAL)
+            row = self._get(key)
+
+        self._count('misses')
+        try:
+            result = func()
+        except Exception:
+            self._release(key, token)
+            raise
+        self._finish(key, token, result)
+        self._evict()
+        return result, False
+
+    def _evict(self):
+        """Membuang kunci kedaluwarsa, lalu kunci terlama jika melebihi max_entries."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_evict < self.EVICT_INTERVAL:
+                return
+            self._last_evict = now
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.expires_at <= datetime.utcnow()))
+            if self.max_entries <= 0:
+                return
+            cutoff = conn.execute(
+                select(t.c.created_at).order_by(t.c.created_at.desc())
+                .offset(self.max_entries).limit(1)
+            ).scalar()
+            if cutoff is not None:
+                conn.execute(delete(t).where(t.c.created_at <= cutoff, t.c.status.is_not(None)))
+
+    def snapshot(self):
+        with self.db.engine.connect() as conn:
+            entries = conn.execute(select(func.count()).select_from(self.table)).scalar()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "entries": entries,
+                "hits": self.hits,
+                "collapsed": self.collapsed,
+                "misses": self.misses,
+                "conflicts": self.conflicts,
+            }
@@ -0,0 +1,343 @@
+"""
+Load test untuk backend sistem pakar.
+
+Menjalankan gunicorn lokal (SQLite) untuk setiap kombinasi WEB_CONCURRENCY dan
+worker class, mengirim traffic campuran dari pasien sintetis, lalu melaporkan
+throughput, persentil latensi, dan error rate.
+
+Contoh:
+    python loadtest.py --profile mixed --workers 1,2,4 --worker-class sync,gthread --duration 30
+    python loadtest.py --url http://localhost:5000 --profile intake
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from fuzzy import GEJALA_WEIGHTS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Peluang gejala pada populasi skrining
+GEJALA_PREVALENSI = {
+    'nyeri_dada': 0.12,
+    'sesak_napas': 0.15,
+    'jantung_berdebar': 0.18,
+    'keringat_dingin': 0.08,
+    'bengkak_kaki': 0.07,
+    'mudah_lelah': 0.30,
+    'lemas': 0.25,
+    'pusing': 0.28,
+}
+
+ASPEK_PSIKOLOGIS = [
+    ("Normal", 0.70), ("Cemas", 0.12), ("Takut", 0.06),
+    ("Marah", 0.05), ("Depresi", 0.06), ("Kecenderungan Bunuh Diri", 0.01),
+]
+
+# Bobot endpoint per profil traffic
+PROFILES = {
+    'intake': [('diagnosis', 0.85), ('statistik', 0.10), ('feedback_post', 0.05)],
+    'dashboard': [('statistik', 0.40), ('list', 0.30), ('detail', 0.20), ('feedback_get', 0.10)],
+    'export': [('export', 0.50), ('list', 0.25), ('detail', 0.20), ('feedback_get', 0.05)],
+    'mixed': [('diagnosis', 0.40), ('statistik', 0.20), ('list', 0.15),
+              ('detail', 0.15), ('feedback_get', 0.05), ('feedback_post', 0.05)],
+}
+
+
+def _weighted_choice(rng, pairs):
+    r = rng.random() * sum(w for _, w in pairs)
+    for value, weight in pairs:
+        r -= weight
+        if r <= 0:
+            return value
+    return pairs[-1][0]
+
+
+def _clip(value, low, high):
+    return max(low, min(high, value))
+
+
+def generate_patient(rng, index=0):
+    """Membuat satu payload /api/diagnosis dengan distribusi yang realistis."""
+    gender = rng.choice(["Pria", "Wanita"])
+    usia = int(_clip(rng.gauss(45, 16), 18, 90))
+
+    tinggi = rng.gauss(167, 7) if gender == "Pria" else rng.gauss(155, 6)
+    tinggi = round(_clip(tinggi, 135, 200), 1)
+    bmi = _clip(rng.lognormvariate(3.2, 0.18), 14, 50)
+    berat = round(bmi * (tinggi / 100) ** 2, 1)
+
+    # Tekanan darah naik seiring usia dan BMI
+    sistolik = int(_clip(rng.gauss(105 + 0.5 * usia + 0.6 * (bmi - 22), 14), 80, 220))
+    diastolik = int(_clip(rng.gauss(0.62 * sistolik, 7), 45, 130))
+
+    merokok = rng.random() < (0.45 if gender == "Pria" else 0.05)
+    riwayat = rng.random() < _clip(0.03 + (usia - 30) * 0.004, 0.02, 0.4)
+
+    # Gejala lebih sering muncul pada pasien berisiko
+    faktor = 1.0 + 0.5 * riwayat + 0.3 * merokok + (0.4 if sistolik >= 140 else 0.0)
+    gejala = {
+        key.replace("_", " ").title(): "Ya" if rng.random() < min(0.9, p * faktor) else "Tidak"
+        for key, p in GEJALA_PREVALENSI.items()
+        if key in GEJALA_WEIGHTS
+    }
+
+    return {
+        "nama": f"Pasien Sintetis {index}",
+        "usia": usia,
+        "gender": gender,
+        "weight": berat,
+        "height": tinggi,
+        "sistolik": sistolik,
+        "diastolik": diastolik,
+        "riwayatPenyakit": "Ada" if riwayat else "Tidak Ada",
+        "riwayatMerokok": "Ya" if merokok else "Tidak",
+        "aspekPsikologis": _weighted_choice(rng, ASPEK_PSIKOLOGIS),
+        "gejala": gejala,
+    }
+
+
+def _request(base_url, method, path, payload=None, headers=None, timeout=30):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    for key, value in (headers or {}).items():
+        req.add_header(key, value)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class LoadRunner:
+    """Menjalankan client thread yang memilih endpoint sesuai profil."""
+
+    def __init__(self, base_url, profile, concurrency, duration, seed=42, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.profile = PROFILES[profile]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.seed = seed
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.samples = []  # (endpoint, latency_detik, ok)
+        self._known_ids = []
+
+    def _do(self, rng, endpoint, counter):
+        if endpoint == 'diagnosis':
+            payload = generate_patient(rng, counter)
+            return _request(self.base_url, "POST", "/api/diagnosis", payload,
+                            {"Idempotency-Key": str(uuid.uuid4())}, self.timeout)
+        if endpoint == 'statistik':
+            return _request(self.base_url, "GET", "/api/statistik-harian", timeout=self.timeout)
+        if endpoint == 'list':
+            status, body = _request(self.base_url, "GET", "/api/data-masyarakat", timeout=self.timeout)
+            if status == 200:
+                ids = [row["id"] for row in json.loads(body)[:200]]
+                with self._lock:
+                    self._known_ids = ids
+            return status, body
+        if endpoint == 'detail':
+            with self._lock:
+                ids = self._known_ids
+            record_id = rng.choice(ids) if ids else 1
+            status, body = _request(self.base_url, "GET", f"/api/data-masyarakat/{record_id}", timeout=self.timeout)
+            # 404 wajar jika data belum ada
+            return (200 if status == 404 else status), body
+        if endpoint == 'export':
+            fmt = rng.choice(["csv", "ndjson"])
+            return _request(self.base_url, "GET", f"/api/data-masyarakat/export?format={fmt}", timeout=self.timeout)
+        if endpoint == 'feedback_get':
+            return _request(self.base_url, "GET", "/api/feedback", timeout=self.timeout)
+        if endpoint == 'feedback_post':
+            payload = {"nama": f"Penguji {counter}", "email": f"uji{counter}@example.com", "pesan": "Uji beban"}
+            return _request(self.base_url, "POST", "/api/feedback", payload, timeout=self.timeout)
+        raise ValueError(endpoint)
+
+    def _client(self, client_id, deadline):
+        rng = random.Random(self.seed * 1000 + client_id)
+        counter = client_id * 1_000_000
+        local = []
+        while time.monotonic() < deadline:
+            endpoint = _weighted_choice(rng, self.profile)
+            counter += 1
+            start = time.perf_counter()
+            try:
+                status, _ = self._do(rng, endpoint, counter)
+                ok = 200 <= status < 300
+            except Exception:
+                ok = False
+            local.append((endpoint, time.perf_counter() - start, ok))
+        with self._lock:
+            self.samples.extend(local)
+
+    def run(self):
+        deadline = time.monotonic() + self.duration
+        threads = [threading.Thread(target=self._client, args=(i, deadline), daemon=True)
+                   for i in range(self.concurrency)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return summarize(self.samples, time.monotonic() - start)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _stats(samples, elapsed):
+    latencies = sorted(lat for _, lat, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    total = len(samples)
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(_percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def summarize(samples, elapsed):
+    """Ringkasan keseluruhan dan per endpoint."""
+    result = _stats(samples, elapsed)
+    result["endpoints"] = {
+        name: _stats([s for s in samples if s[0] == name], elapsed)
+        for name in sorted({s[0] for s in samples})
+    }
+    return result
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class GunicornServer:
+    """Menjalankan gunicorn dengan gunicorn.conf.py dan database SQLite sementara."""
+
+    def __init__(self, workers, worker_class, threads=1, startup_timeout=30):
+        self.workers = workers
+        self.worker_class = worker_class
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self.port = _free_port()
+        self.tmpdir = None
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="loadtest-")
+        env = dict(os.environ)
+        env.update({
+            "PORT": str(self.port),
+            "WEB_CONCURRENCY": str(self.workers),
+            "GUNICORN_WORKER_CLASS": self.worker_class,
+            "GUNICORN_THREADS": str(self.threads),
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.tmpdir, 'loadtest.db')}",
+        })
+        env.pop("DATABASE_READ_URL", None)
+        # Rate limit per klien akan menolak semua client lokal; aktifkan dengan ADMISSION_ENABLED=true
+        env.setdefault("ADMISSION_ENABLED", "false")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "app:app", "--config", "gunicorn.conf.py"],
+            cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("gunicorn berhenti saat startup")
+            try:
+                status, _ = _request(self.url, "GET", "/api/statistik-harian", timeout=2)
+                if status == 200:
+                    return self
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError("gunicorn tidak siap dalam batas waktu")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def print_report(rows):
+    header = f"{'workers':>7} {'class':>9} {'thr':>3} {'req':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        r = row["result"]
+        print(f"{row['workers']:>7} {row['worker_class']:>9} {row['threads']:>3} {r['requests']:>7} "
+              f"{r['throughput_rps']:>8} {r['error_rate'] * 100:>6.2f} {r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test backend sistem pakar")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--duration", type=float, default=20, help="detik per konfigurasi")
+    parser.add_argument("--concurrency", type=int, default=8, help="jumlah client paralel")
+    parser.add_argument("--workers", default="1", help="daftar WEB_CONCURRENCY, mis. 1,2,4")
+    parser.add_argument("--worker-class", default="sync", help="daftar worker class, mis. sync,gthread")
+    parser.add_argument("--threads", type=int, default=4, help="thread per worker untuk gthread")
+    parser.add_argument("--url", help="pakai server yang sudah berjalan, tanpa meluncurkan gunicorn")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup", type=int, default=20, help="jumlah pasien awal sebelum pengukuran")
+    parser.add_argument("--json", dest="json_path", help="simpan hasil lengkap ke file JSON")
+    args = parser.parse_args(argv)
+
+    def run_against(url):
+        rng = random.Random(args.seed)
+        for i in range(args.warmup):
+            _request(url, "POST", "/api/diagnosis", generate_patient(rng, -i - 1))
+        return LoadRunner(url, args.profile, args.concurrency, args.duration, args.seed).run()
+
+    rows = []
+    if args.url:
+        rows.append({"workers": "-", "worker_class": "-", "threads": "-", "result": run_against(args.url)})
+    else:
+        for worker_class in [w.strip() for w in args.worker_class.split(",") if w.strip()]:
+            for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+                threads = args.threads if worker_class == "gthread" else 1
+                print(f"▶️  {args.profile}: workers={workers} class={worker_class} threads={threads}", file=sys.stderr)
+                with GunicornServer(workers, worker_class, threads) as server:
+                    rows.append({"workers": workers, "worker_class": worker_class,
+                                 "threads": threads, "result": run_against(server.url)})
+
+    print_report(rows)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"profile": args.profile, "runs": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
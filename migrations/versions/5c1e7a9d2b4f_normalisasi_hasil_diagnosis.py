@@ -0,0 +1,108 @@
+"""normalisasi diagnosis, risiko, saran ke tabel hasil_diagnosis
+
+Revision ID: 5c1e7a9d2b4f
+Revises: 33fb7eeca03f
+Create Date: 2026-10-19 10:12:41.508113
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9d2b4f'
+down_revision = '33fb7eeca03f'
+branch_labels = None
+depends_on = None
+
+KatalogId = sa.SmallInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def _kode(diagnosis, risiko, saran):
+    raw = "\x1f".join(v or "" for v in (diagnosis, risiko, saran))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def upgrade():
+    columns = [
+        sa.Column('id', KatalogId, primary_key=True, autoincrement=True),
+        sa.Column('kode', sa.String(length=64), nullable=False),
+        sa.Column('diagnosis', sa.String(length=100), nullable=True),
+        sa.Column('risiko', sa.String(length=50), nullable=True),
+        sa.Column('saran', sa.Text(), nullable=True),
+    ]
+    conn = op.get_bind()
+    # init_db() di app.py mungkin sudah membuat tabel ini lewat create_all()
+    if sa.inspect(conn).has_table('hasil_diagnosis'):
+        hasil = sa.Table('hasil_diagnosis', sa.MetaData(), *columns)
+    else:
+        hasil = op.create_table('hasil_diagnosis', *columns,
+            sa.UniqueConstraint('kode', name='uq_hasil_diagnosis_kode'))
+
+    with op.batch_alter_table('diagnosa', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hasil_id', KatalogId, nullable=True))
+
+    # Deduplikasi kombinasi yang sudah ada lalu isi hasil_id
+    diagnosa = sa.table('diagnosa',
+        sa.column('hasil_id', KatalogId),
+        sa.column('diagnosis', sa.String),
+        sa.column('risiko', sa.String),
+        sa.column('saran', sa.Text),
+    )
+    combos = conn.execute(
+        sa.select(diagnosa.c.diagnosis, diagnosa.c.risiko, diagnosa.c.saran).distinct()
+    ).all()
+    for diagnosis, risiko, saran in combos:
+        kode = _kode(diagnosis, risiko, saran)
+        if conn.execute(sa.select(hasil.c.id).where(hasil.c.kode == kode)).scalar() is None:
+            conn.execute(hasil.insert().values(kode=kode, diagnosis=diagnosis, risiko=risiko, saran=saran))
+        hasil_id = conn.execute(sa.select(hasil.c.id).where(hasil.c.kode == kode)).scalar()
+        conn.execute(
+            diagnosa.update()
+            .where(diagnosa.c.diagnosis.is_not_distinct_from(diagnosis))
+            .where(diagnosa.c.risiko.is_not_distinct_from(risiko))
+            .where(diagnosa.c.saran.is_not_distinct_from(saran))
+            .values(hasil_id=hasil_id)
+        )
+
+    with op.batch_alter_table('diagnosa', schema=None) as batch_op:
+        batch_op.alter_column('hasil_id', existing_type=KatalogId, nullable=False)
+        batch_op.create_foreign_key('fk_diagnosa_hasil_id', 'hasil_diagnosis', ['hasil_id'], ['id'])
+        batch_op.drop_column('saran')
+        batch_op.drop_column('risiko')
+        batch_op.drop_column('diagnosis')
+
+
+def downgrade():
+    with op.batch_alter_table('diagnosa', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('diagnosis', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('risiko', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('saran', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    hasil = sa.table('hasil_diagnosis',
+        sa.column('id', KatalogId),
+        sa.column('diagnosis', sa.String),
+        sa.column('risiko', sa.String),
+        sa.column('saran', sa.Text),
+    )
+    diagnosa = sa.table('diagnosa',
+        sa.column('hasil_id', KatalogId),
+        sa.column('diagnosis', sa.String),
+        sa.column('risiko', sa.String),
+        sa.column('saran', sa.Text),
+    )
+    for row in conn.execute(sa.select(hasil)).all():
+        conn.execute(
+            diagnosa.update()
+            .where(diagnosa.c.hasil_id == row.id)
+            .values(diagnosis=row.diagnosis, risiko=row.risiko, saran=row.saran)
+        )
+
+    with op.batch_alter_table('diagnosa', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_diagnosa_hasil_id', type_='foreignkey')
+        batch_op.drop_column('hasil_id')
+
+    op.drop_table('hasil_diagnosis')
@@ -0,0 +1,74 @@
+"""partisi tabel diagnosa per bulan pada created_at
+
+Revision ID: 8d4b2f6a1c3e
+Revises: 5c1e7a9d2b4f
+Create Date: 2026-10-19 14:37:05.219846
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b2f6a1c3e'
+down_revision = '5c1e7a9d2b4f'
+branch_labels = None
+depends_on = None
+
+# Bulan ke depan yang langsung dibuatkan partisi
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _has_index(conn, name):
+    return any(ix['name'] == name for ix in sa.inspect(conn).get_indexes('diagnosa'))
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _has_index(conn, 'ix_diagnosa_created_at'):
+        op.create_index('ix_diagnosa_created_at', 'diagnosa', ['created_at'])
+
+    if conn.dialect.name != 'mysql':
+        # SQLite dkk. memakai rentang created_at pada indeks di atas (lihat arsip.RangePartitions)
+        return
+
+    op.execute("UPDATE diagnosa SET created_at = UTC_TIMESTAMP() WHERE created_at IS NULL")
+
+    # Partisi InnoDB tidak mendukung foreign key, dan kolom partisi harus ada di primary key
+    op.drop_constraint('fk_diagnosa_hasil_id', 'diagnosa', type_='foreignkey')
+    op.execute(
+        "ALTER TABLE diagnosa MODIFY created_at DATETIME NOT NULL, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    )
+
+    oldest = conn.execute(sa.text("SELECT MIN(created_at) FROM diagnosa")).scalar() or datetime.utcnow()
+    month = datetime(oldest.year, oldest.month, 1)
+    last = _add_months(datetime(datetime.utcnow().year, datetime.utcnow().month, 1), MONTHS_AHEAD)
+    partitions = []
+    while month <= last:
+        upper = _add_months(month, 1).strftime('%Y-%m-%d')
+        partitions.append(f"PARTITION p{month.strftime('%Y%m')} VALUES LESS THAN (TO_DAYS('{upper}'))")
+        month = _add_months(month, 1)
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+    op.execute(
+        "ALTER TABLE diagnosa PARTITION BY RANGE (TO_DAYS(created_at)) (" + ", ".join(partitions) + ")"
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'mysql':
+        op.execute("ALTER TABLE diagnosa REMOVE PARTITIONING")
+        op.execute("ALTER TABLE diagnosa DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+        op.create_foreign_key('fk_diagnosa_hasil_id', 'diagnosa', 'hasil_diagnosis', ['hasil_id'], ['id'])
+
+    if _has_index(conn, 'ix_diagnosa_created_at'):
+        op.drop_index('ix_diagnosa_created_at', table_name='diagnosa')
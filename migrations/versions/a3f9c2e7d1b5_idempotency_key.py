@@ -0,0 +1,38 @@
+"""tabel idempotency_key untuk kiriman ulang /api/diagnosis
+
+Revision ID: a3f9c2e7d1b5
+Revises: 8d4b2f6a1c3e
+Create Date: 2026-10-19 16:52:18.402736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c2e7d1b5'
+down_revision = '8d4b2f6a1c3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # init_db() di app.py mungkin sudah membuat tabel ini lewat create_all()
+    if sa.inspect(op.get_bind()).has_table('idempotency_key'):
+        return
+    op.create_table('idempotency_key',
+        sa.Column('kunci', sa.String(length=64), nullable=False),
+        sa.Column('payload_hash', sa.String(length=64), nullable=False),
+        sa.Column('pemilik', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.Integer(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('kunci'),
+    )
+    op.create_index('ix_idempotency_key_created_at', 'idempotency_key', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_idempotency_key_created_at', table_name='idempotency_key')
+    op.drop_table('idempotency_key')
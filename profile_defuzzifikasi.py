@@ -0,0 +1,98 @@
+"""
+Profil akurasi dan latensi strategi defuzzifikasi.
+
+Setiap strategi di fuzzy.DEFUZZIFIKASI_METHODS dibandingkan dengan centroid
+referensi (universe 0-100, langkah 1) pada input pasien sintetis.
+
+Contoh:
+    python profile_defuzzifikasi.py --samples 20000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from fuzzy import DEFUZZIFIKASI_METHODS, defuzzifikasi_centroid, fuzzy_aggregated
+from loadtest import generate_patient
+from utils import calculate_bmi, format_diagnosis_result
+
+REFERENCE = 'centroid'
+
+
+def build_inputs(samples, seed):
+    """Hasil agregasi fuzzy untuk input sintetis (dihitung sekali untuk semua strategi)."""
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(samples):
+        p = generate_patient(rng, i)
+        bmi = calculate_bmi(p["weight"], p["height"])
+        inputs.append(fuzzy_aggregated(
+            p["usia"], p["gender"], bmi, p["sistolik"], p["diastolik"],
+            p["riwayatPenyakit"], p["riwayatMerokok"], p["aspekPsikologis"], p["gejala"]
+        ))
+    return inputs
+
+
+def profile(inputs, methods=None, repeat=3):
+    reference = np.array([float(defuzzifikasi_centroid(agg)) for agg in inputs])
+    reference_risk = [format_diagnosis_result(score)['risiko'] for score in reference]
+
+    report = {}
+    for name in methods or DEFUZZIFIKASI_METHODS:
+        func = DEFUZZIFIKASI_METHODS[name]
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scores = [float(func(agg)) for agg in inputs]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        scores = np.array(scores)
+        error = np.abs(scores - reference)
+        risk_mismatch = sum(
+            1 for score, ref in zip(scores, reference_risk)
+            if format_diagnosis_result(score)['risiko'] != ref
+        )
+        report[name] = {
+            "us_per_call": round(best / len(inputs) * 1e6, 2),
+            "mean_abs_error": round(float(error.mean()), 4),
+            "p99_abs_error": round(float(np.percentile(error, 99)), 4),
+            "max_abs_error": round(float(error.max()), 4),
+            "risk_mismatch_rate": round(risk_mismatch / len(inputs), 4),
+        }
+    return report
+
+
+def print_report(report):
+    ref_us = report.get(REFERENCE, {}).get("us_per_call")
+    header = f"{'metode':<20} {'us/call':>9} {'speedup':>8} {'mean err':>9} {'p99 err':>9} {'max err':>9} {'risk diff':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in sorted(report.items(), key=lambda item: item[1]["us_per_call"]):
+        speedup = f"{ref_us / r['us_per_call']:.1f}x" if ref_us and r["us_per_call"] else "-"
+        print(f"{name:<20} {r['us_per_call']:>9} {speedup:>8} {r['mean_abs_error']:>9} "
+              f"{r['p99_abs_error']:>9} {r['max_abs_error']:>9} {r['risk_mismatch_rate'] * 100:>8.2f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil strategi defuzzifikasi")
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--methods", help="daftar metode dipisah koma (default: semua)")
+    parser.add_argument("--json", dest="json_path", help="simpan hasil ke file JSON")
+    args = parser.parse_args(argv)
+
+    methods = [m.strip() for m in args.methods.split(",")] if args.methods else None
+    inputs = build_inputs(args.samples, args.seed)
+    report = profile(inputs, methods, args.repeat)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"samples": args.samples, "seed": args.seed, "methods": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Skoring offline file CSV/NDJSON tanpa lewat HTTP.
+
+Baris dibaca dan ditulis secara streaming per chunk (memori konstan), diproses
+paralel di beberapa core, dan opsional dimuat langsung ke tabel diagnosa.
+
+Kolom input sama dengan payload /api/diagnosis: nama, usia, gender, weight,
+height, sistolik, diastolik, riwayatPenyakit, riwayatMerokok, aspekPsikologis,
+dan gejala (objek JSON). Pada CSV, gejala boleh berupa kolom JSON `gejala`
+atau satu kolom per gejala (mis. `nyeri_dada` / `Nyeri Dada` berisi Ya/Tidak).
+
+Contoh:
+    python score_file.py skrining.csv hasil.csv --workers 4
+    python score_file.py skrining.ndjson - --method centroid_grid_1 > hasil.ndjson
+    DATABASE_URL=mysql://... python score_file.py skrining.csv hasil.csv --load-db
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from fuzzy import DEFUZZIFIKASI_METHODS, GEJALA_WEIGHTS, fuzzy_diagnosis, normalize_symptom_keys
+from utils import calculate_bmi, get_bmi_category, klasifikasi_tekanan_darah
+
+OUTPUT_FIELDS = ["bmi", "kategori_bmi", "kategori_tekanan_darah", "diagnosis", "persentase", "risiko"]
+# Penanda baris input yang tidak bisa dibaca; dicatat di kolom error, bukan menghentikan run
+INPUT_ERROR = "_input_error"
+
+
+def _detect_format(path, explicit=None):
+    if explicit:
+        return explicit
+    if path.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(handle, fmt):
+    """
+    Membaca baris satu per satu sebagai dict. Baris NDJSON yang rusak
+    menghasilkan dict berisi INPUT_ERROR saja.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+        return
+    for number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {INPUT_ERROR: f"baris {number}: {type(e).__name__}: {e}"}
+            continue
+        if not isinstance(row, dict):
+            yield {INPUT_ERROR: f"baris {number}: bukan objek JSON"}
+            continue
+        yield row
+
+
+def _extract_gejala(row):
+    gejala = row.get("gejala")
+    if isinstance(gejala, dict):
+        return gejala
+    if isinstance(gejala, str) and gejala.strip():
+        return json.loads(gejala)
+    # Kolom per gejala pada CSV
+    normalized = normalize_symptom_keys({k: str(v) for k, v in row.items() if k and v is not None})
+    return {key: normalized.get(key, "tidak") for key in GEJALA_WEIGHTS}
+
+
+def score_row(row, method=None, with_saran=False):
+    """Menghitung kolom turunan dan hasil fuzzy untuk satu baris."""
+    if INPUT_ERROR in row:
+        return {"error": row[INPUT_ERROR]}
+    try:
+        age = int(row["usia"])
+        gender_str = row["gender"]
+        weight = float(row["weight"])
+        height = float(row["height"])
+        sistolik = int(row["sistolik"])
+        diastolik = int(row["diastolik"])
+        symptoms = _extract_gejala(row)
+
+        bmi = calculate_bmi(weight, height)
+        diagnosis_result, percentage, risiko, saran = fuzzy_diagnosis(
+            age, gender_str, bmi, sistolik, diastolik,
+            row["riwayatPenyakit"], row["riwayatMerokok"], row["aspekPsikologis"], symptoms,
+            method=method,
+        )
+        result = {
+            "bmi": bmi,
+            "kategori_bmi": get_bmi_category(bmi),
+            "kategori_tekanan_darah": klasifikasi_tekanan_darah(sistolik, diastolik),
+            "diagnosis": diagnosis_result,
+            "persentase": percentage,
+            "risiko": risiko,
+            "_gejala": symptoms,
+            "_saran": saran,
+        }
+        if with_saran:
+            result["saran"] = saran
+        return result
+    except Exception as e:
+        # Satu baris buruk (mis. tinggi 0 -> ZeroDivisionError) tidak boleh menghentikan run
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def score_chunk(rows, method=None, with_saran=False):
+    return [score_row(row, method, with_saran) for row in rows]
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_scored(chunks, func, workers):
+    """
+    Menghasilkan (rows, hasil) per chunk sesuai urutan input. Jumlah chunk yang
+    sedang diproses dibatasi agar memori tetap konstan.
+    """
+    if workers <= 1:
+        for rows in chunks:
+            yield rows, func(rows)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for rows in chunks:
+            pending.append((rows, executor.submit(func, rows)))
+            if len(pending) >= workers * 2:
+                rows_done, future = pending.popleft()
+                yield rows_done, future.result()
+        while pending:
+            rows_done, future = pending.popleft()
+            yield rows_done, future.result()
+
+
+class OutputWriter:
+    def __init__(self, handle, fmt, extra_fields):
+        self.handle = handle
+        self.fmt = fmt
+        self.extra_fields = extra_fields
+        self._csv = None
+        self._pending = []
+
+    def write(self, row, result):
+        if self.fmt == "csv" and self._csv is None and INPUT_ERROR in row:
+            # Header CSV diambil dari baris valid pertama
+            self._pending.append((row, result))
+            return
+        out = {k: v for k, v in row.items() if k != INPUT_ERROR}
+        if self.fmt == "ndjson":
+            if isinstance(out.get("gejala"), str):
+                out.pop("gejala")
+            if "_gejala" in result:
+                out["gejala"] = result["_gejala"]
+        elif isinstance(out.get("gejala"), dict):
+            # JSON, bukan repr Python, agar output bisa dibaca ulang oleh _extract_gejala
+            out["gejala"] = json.dumps(out["gejala"], ensure_ascii=False)
+        out.update({k: v for k, v in result.items() if not k.startswith("_")})
+        if self.fmt == "ndjson":
+            self.handle.write(json.dumps(out, ensure_ascii=False) + "\n")
+            return
+        if self._csv is None:
+            fields = [k for k in row if k != INPUT_ERROR]
+            fields += [f for f in self.extra_fields if f not in fields]
+            self._csv = csv.DictWriter(self.handle, fieldnames=fields, extrasaction="ignore")
+            self._csv.writeheader()
+            pending, self._pending = self._pending, []
+            for pending_row, pending_result in pending:
+                self.write(pending_row, pending_result)
+        self._csv.writerow(out)
+
+    def close(self):
+        """Menulis baris yang masih tertahan jika tidak ada satu pun baris valid."""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._csv = csv.DictWriter(self.handle, fieldnames=self.extra_fields, extrasaction="ignore")
+            self._csv.writeheader()
+            for row, result in pending:
+                self.write(row, result)
+
+
+class DiagnosaLoader:
+    """Bulk insert hasil skoring ke tabel diagnosa per chunk."""
+
+    def __init__(self):
+        # Impor di sini agar skoring tanpa --load-db tidak butuh database;
+        # log startup app dialihkan ke stderr agar output ke stdout tetap bersih
+        with contextlib.redirect_stdout(sys.stderr):
+            from app import app, db, Diagnosa, hasil_katalog
+        self.app, self.db, self.table, self.katalog = app, db, Diagnosa.__table__, hasil_katalog
+        self.inserted = 0
+
+    def load(self, pairs):
+        with self.app.app_context():
+            values = [
+                {
+                    "nama": row.get("nama") or "",
+                    "usia": int(row["usia"]),
+                    "jenis_kelamin": row["gender"],
+                    "berat_badan": float(row["weight"]),
+                    "tinggi_badan": float(row["height"]),
+                    "bmi": result["bmi"],
+                    "kategori_bmi": result["kategori_bmi"],
+                    "sistolik": int(row["sistolik"]),
+                    "diastolik": int(row["diastolik"]),
+                    "kategori_tekanan_darah": result["kategori_tekanan_darah"],
+                    "riwayat_penyakit": row["riwayatPenyakit"],
+                    "riwayat_merokok": row["riwayatMerokok"],
+                    "aspek_psikologis": row["aspekPsikologis"],
+                    "hasil_id": self.katalog.get_id(result["diagnosis"], result["risiko"], result["_saran"]),
+                    "persentase": result["persentase"],
+                    "gejala": str(result["_gejala"]),
+                }
+                for row, result in pairs if "error" not in result
+            ]
+            if values:
+                with self.db.engine.begin() as conn:
+                    conn.execute(self.table.insert(), values)
+        self.inserted += len(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skoring offline file CSV/NDJSON")
+    parser.add_argument("input", help="file input, atau - untuk stdin")
+    parser.add_argument("output", help="file output, atau - untuk stdout")
+    parser.add_argument("--input-format", choices=["csv", "ndjson"])
+    parser.add_argument("--output-format", choices=["csv", "ndjson"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--method", choices=sorted(DEFUZZIFIKASI_METHODS), help="strategi defuzzifikasi")
+    parser.add_argument("--with-saran", action="store_true", help="sertakan teks saran di output")
+    parser.add_argument("--load-db", action="store_true", help="muat hasil ke tabel diagnosa (DATABASE_URL)")
+    args = parser.parse_args(argv)
+
+    in_fmt = _detect_format(args.input, args.input_format)
+    out_fmt = _detect_format(args.output, args.output_format or (in_fmt if args.output == "-" else None))
+    extra_fields = OUTPUT_FIELDS + (["saran"] if args.with_saran else []) + ["error"]
+
+    fin = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    loader = DiagnosaLoader() if args.load_db else None
+    writer = OutputWriter(fout, out_fmt, extra_fields)
+    func = partial(score_chunk, method=args.method, with_saran=args.with_saran)
+
+    total = errors = 0
+    start = last_report = time.monotonic()
+    try:
+        chunks = chunked(read_rows(fin, in_fmt), args.chunk_size)
+        for rows, results in iter_scored(chunks, func, args.workers):
+            for row, result in zip(rows, results):
+                writer.write(row, result)
+                errors += "error" in result
+            if loader:
+                loader.load(list(zip(rows, results)))
+            total += len(rows)
+            now = time.monotonic()
+            if now - last_report >= 5:
+                print(f"⏱️  {total} baris, {total / (now - start):.0f} baris/detik", file=sys.stderr)
+                last_report = now
+        writer.close()
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+
+    elapsed = time.monotonic() - start
+    rate = total / elapsed if elapsed else 0.0
+    print(f"✅ {total} baris ({errors} error) dalam {elapsed:.2f} detik, {rate:.0f} baris/detik", file=sys.stderr)
+    if loader:
+        print(f"📥 {loader.inserted} baris dimuat ke tabel diagnosa", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
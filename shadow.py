@@ -0,0 +1,182 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from fuzzy import DEFUZZIFIKASI_METHODS, GEJALA_WEIGHTS, RULE_WEIGHTS, defuzzifikasi, fuzzy_aggregated
+from utils import format_diagnosis_result
+
+
+class ShadowModel:
+    """Kandidat parameter: override GEJALA_WEIGHTS, RULE_WEIGHTS, dan metode defuzzifikasi."""
+
+    def __init__(self, name, gejala_weights=None, rule_weights=None, method=None):
+        # Konfigurasi salah harus gagal saat startup, bukan diam-diam terhitung error per sampel
+        if method is not None and method not in DEFUZZIFIKASI_METHODS:
+            raise ValueError(f"Shadow model {name}: method tidak dikenal: {method}")
+        unknown = set(gejala_weights or {}) - set(GEJALA_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Shadow model {name}: gejala tidak dikenal: {sorted(unknown)}")
+        rules = {}
+        for key, value in (rule_weights or {}).items():
+            try:
+                rules[int(key)] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Shadow model {name}: rule_weights tidak valid: {key!r}: {value!r}") from None
+        unknown = set(rules) - set(RULE_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Shadow model {name}: rule tidak dikenal: {sorted(unknown)} "
+                             f"(rule {min(RULE_WEIGHTS)}-{max(RULE_WEIGHTS)})")
+        self.name = name
+        self.gejala_weights = {**GEJALA_WEIGHTS, **(gejala_weights or {})}
+        self.rule_weights = {**RULE_WEIGHTS, **rules}
+        self.method = method
+
+    def score(self, age, gender, bmi, sistolik, diastolik, riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms):
+        aggregated = fuzzy_aggregated(
+            age, gender, bmi, sistolik, diastolik,
+            riwayat_penyakit, riwayat_merokok, aspek_psikologis, symptoms,
+            gejala_weights=self.gejala_weights, rule_weights=self.rule_weights,
+        )
+        score = defuzzifikasi(aggregated, self.method)
+        return round(score, 2), format_diagnosis_result(score)['risiko']
+
+
+def load_models(spec):
+    """
+    SHADOW_MODELS: path file JSON atau JSON langsung, berisi daftar
+    {"name": ..., "gejala_weights": {...}, "rule_weights": {...}, "method": ...}.
+    """
+    if not spec:
+        return []
+    if not spec.lstrip().startswith("["):
+        with open(spec) as f:
+            spec = f.read()
+    return [ShadowModel(**item) for item in json.loads(spec)]
+
+
+class _ModelStats:
+    def __init__(self, window=1000):
+        self.count = 0
+        self.errors = 0
+        self.risk_mismatch = 0
+        self.abs_diff_total = 0.0
+        self.abs_diff_max = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "risk_mismatch_rate": round(self.risk_mismatch / self.count, 4) if self.count else 0.0,
+            "mean_abs_score_diff": round(self.abs_diff_total / self.count, 4) if self.count else 0.0,
+            "max_abs_score_diff": round(self.abs_diff_max, 4),
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3) if latencies else 0.0,
+        }
+
+
+class ShadowScorer:
+    """
+    Menjalankan model kandidat pada sebagian traffic /api/diagnosis di thread
+    latar belakang. Request hanya memasukkan input ke antrean terbatas; jika
+    antrean penuh, sampel dibuang.
+    """
+
+    def __init__(self, models=None, sample_rate=None, queue_size=None, log_path=None):
+        self.models = load_models(os.environ.get("SHADOW_MODELS")) if models is None else models
+        self.sample_rate = float(os.environ.get("SHADOW_SAMPLE_RATE", 0.1)) if sample_rate is None else sample_rate
+        self.queue_size = int(os.environ.get("SHADOW_QUEUE_SIZE", 1000)) if queue_size is None else queue_size
+        self.log_path = os.environ.get("SHADOW_LOG") if log_path is None else log_path
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self.submitted = 0
+        self.dropped = 0
+        self.production = _ModelStats()
+        self.stats = {model.name: _ModelStats() for model in self.models}
+
+    @property
+    def enabled(self):
+        return bool(self.models) and self.sample_rate > 0
+
+    def _ensure_worker(self):
+        # Thread dibuat per proses; thread milik master gunicorn tidak ikut fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            threading.Thread(target=self._run, name="shadow-scorer", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, inputs, production_score, production_risiko, production_latency):
+        """Dipanggil di jalur request; tidak pernah memblokir."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((inputs, production_score, production_risiko, production_latency))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.submitted += 1
+
+    def _run(self):
+        q = self._queue
+        while True:
+            item = q.get()
+            try:
+                self._evaluate(*item)
+            except Exception as e:
+                print(f"❌ ERROR shadow scoring: {e}")
+            finally:
+                q.task_done()
+
+    def _evaluate(self, inputs, production_score, production_risiko, production_latency):
+        with self._lock:
+            self.production.count += 1
+            self.production.latencies.append(production_latency)
+
+        record = {"production": {"score": production_score, "risiko": production_risiko}}
+        for model in self.models:
+            start = time.perf_counter()
+            try:
+                score, risiko = model.score(*inputs)
+            except Exception:
+                with self._lock:
+                    self.stats[model.name].errors += 1
+                continue
+            elapsed = time.perf_counter() - start
+            diff = abs(score - production_score)
+            with self._lock:
+                s = self.stats[model.name]
+                s.count += 1
+                s.latencies.append(elapsed)
+                s.abs_diff_total += diff
+                s.abs_diff_max = max(s.abs_diff_max, diff)
+                s.risk_mismatch += risiko != production_risiko
+            record[model.name] = {"score": score, "risiko": risiko, "latency_ms": round(elapsed * 1000, 3)}
+
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "queue_depth": self._queue.qsize() if self._queue else 0,
+                "production": {k: v for k, v in self.production.snapshot().items() if k in ("count", "latency_avg_ms", "latency_p95_ms")},
+                "models": {name: s.snapshot() for name, s in self.stats.items()},
+            }
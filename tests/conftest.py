@@ -0,0 +1,107 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py membaca konfigurasi dari environment saat diimpor
+TMP_DIR = tempfile.mkdtemp(prefix="sistempakar-test-")
+PRIMARY_DB = os.path.join(TMP_DIR, "primary.db")
+REPLICA_DB = os.path.join(TMP_DIR, "replica.db")
+ARCHIVE_DIR = os.path.join(TMP_DIR, "arsip")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{PRIMARY_DB}",
+    "DATABASE_READ_URL": f"sqlite:///{REPLICA_DB}",
+    "ARCHIVE_DIR": ARCHIVE_DIR,
+    "DIAGNOSA_HOT_MONTHS": "3",
+    "ADMISSION_ENABLED": "false",
+    "SHADOW_MODELS": "",
+})
+
+import app as app_module  # noqa: E402
+from database import REPLICA_BIND  # noqa: E402
+from loadtest import generate_patient  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def bersihkan():
+    """Tabel, arsip, dan status replica kosong untuk setiap test."""
+    a = app_module
+    with a.app.app_context():
+        for model in (a.Diagnosa, a.Feedback, a.IdempotencyKey):
+            a.db.session.query(model).delete()
+        a.db.session.commit()
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+    a.replica_router._down_until = 0.0
+    yield
+    with a.app.app_context():
+        a.db.session.remove()
+
+
+@pytest.fixture
+def kirim_pasien(client):
+    """POST /api/diagnosis untuk pasien sintetis; mengembalikan JSON response."""
+    import random
+
+    def kirim(index=0, **override):
+        payload = {**generate_patient(random.Random(index), index), **override}
+        response = client.post("/api/diagnosis", json=payload,
+                               headers={"Idempotency-Key": uuid.uuid4().hex})
+        assert response.status_code == 200, response.get_json()
+        return response
+    return kirim
+
+
+class ReplicaFile:
+    """Mengatur isi file SQLite replica dari dalam test."""
+
+    def _dispose(self):
+        with app_module.app.app_context():
+            app_module.db.engines[REPLICA_BIND].dispose()
+
+    def sync(self):
+        """Salin isi primary ke replica (replica up to date)."""
+        self._dispose()
+        src, dst = sqlite3.connect(PRIMARY_DB), sqlite3.connect(REPLICA_DB)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+
+    def execute(self, sql):
+        conn = sqlite3.connect(REPLICA_DB)
+        try:
+            conn.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Replica tanpa tabel, mis. belum selesai disalin."""
+        self._dispose()
+        if os.path.exists(REPLICA_DB):
+            os.remove(REPLICA_DB)
+
+
+@pytest.fixture
+def replica():
+    r = ReplicaFile()
+    yield r
+    r.clear()
@@ -0,0 +1,91 @@
+import threading
+
+from flask import Flask, jsonify
+
+from admission import AdmissionController
+
+
+def _buat_app(monkeypatch, **env):
+    """App kecil dengan endpoint tulis 'diagnosis' yang bisa ditahan lewat Event."""
+    base = {
+        "ADMISSION_ENABLED": "true",
+        "TRUSTED_PROXY_HOPS": "0",
+        "RATE_LIMIT_GLOBAL_RATE": "0",
+        "ADMISSION_MAX_INFLIGHT_WRITE": "2",
+    }
+    for name, value in {**base, **env}.items():
+        monkeypatch.setenv(name, value)
+    app = Flask(__name__)
+    controller = AdmissionController()
+    controller.init_app(app)
+    app.gate = threading.Event()
+    app.gate.set()
+    app.entered = threading.Semaphore(0)
+
+    @app.route("/api/diagnosis", methods=["POST"])
+    def diagnosis():
+        app.entered.release()
+        app.gate.wait(5)
+        return jsonify({"ok": True})
+
+    return app, controller
+
+
+def _post_paralel(app, jumlah):
+    statuses = []
+    lock = threading.Lock()
+
+    def kirim():
+        status = app.test_client().post("/api/diagnosis", json={}).status_code
+        with lock:
+            statuses.append(status)
+
+    threads = [threading.Thread(target=kirim) for _ in range(jumlah)]
+    for t in threads:
+        t.start()
+    return threads, statuses
+
+
+def test_tanpa_trusted_proxy_bucket_per_klien_dimatikan(monkeypatch, capsys):
+    app, controller = _buat_app(monkeypatch, TRUSTED_PROXY_HOPS="")
+
+    assert controller.client_rate == 0
+    assert "TRUSTED_PROXY_HOPS" in capsys.readouterr().out
+
+
+def test_lonjakan_menunggu_slot_bukan_langsung_ditolak(monkeypatch):
+    app, controller = _buat_app(monkeypatch, ADMISSION_INFLIGHT_WAIT_MS="5000")
+    app.gate.clear()
+
+    threads, statuses = _post_paralel(app, 6)
+    for _ in range(2):
+        assert app.entered.acquire(timeout=5)
+    assert controller.snapshot()["inflight"]["write"] == 2
+    app.gate.set()
+    for t in threads:
+        t.join()
+
+    assert statuses == [200] * 6
+    assert controller.snapshot()["rejected"] == {}
+
+
+def test_ditolak_karena_penuh_tidak_memakan_token(monkeypatch):
+    app, controller = _buat_app(
+        monkeypatch,
+        ADMISSION_MAX_INFLIGHT_WRITE="1",
+        ADMISSION_INFLIGHT_WAIT_MS="0",
+        RATE_LIMIT_CLIENT_RATE="0.001",
+        RATE_LIMIT_CLIENT_BURST="2",
+    )
+    app.gate.clear()
+    threads, statuses = _post_paralel(app, 1)
+    assert app.entered.acquire(timeout=5)
+
+    client = app.test_client()
+    assert client.post("/api/diagnosis", json={}).status_code == 503
+    app.gate.set()
+    threads[0].join()
+
+    assert client.post("/api/diagnosis", json={}).status_code == 200
+    assert client.post("/api/diagnosis", json={}).status_code == 429
+    assert controller.snapshot()["rejected"] == {"write_concurrency": 1, "client_rate": 1}
@@ -0,0 +1,124 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from arsip import ArsipSibuk, RangePartitions, add_months, month_key, month_start
+
+BULAN_INI = month_start(datetime.utcnow())
+# DIAGNOSA_HOT_MONTHS=3 di conftest: dua bulan ini sudah di luar jendela hot
+LAMA = add_months(BULAN_INI, -5)
+LEBIH_BARU = add_months(BULAN_INI, -4)
+
+
+@pytest.fixture
+def pasien(app, kirim_pasien):
+    """Tiga pasien: dua di bulan lama, satu hot. Mengembalikan {label: id}."""
+    ids = {}
+    for index, (label, created_at) in enumerate([
+        ("lama", LAMA + timedelta(days=3)),
+        ("lebih_baru", LEBIH_BARU + timedelta(days=10)),
+        ("hot", None),
+    ]):
+        nama = f"Arsip {label}"
+        kirim_pasien(index, nama=nama)
+        with app.app.app_context():
+            row = app.Diagnosa.query.filter_by(nama=nama).one()
+            if created_at:
+                row.created_at = created_at
+                app.db.session.commit()
+            ids[label] = row.id
+    return ids
+
+
+def _jalankan(app):
+    """Pengarsip.run(); bulan tanpa baris baru dibuang dari hasil arsip."""
+    with app.app.app_context():
+        created, archived = app.pengarsip.run()
+    return created, {month: rows for month, rows in archived.items() if rows}
+
+
+def _ids_di_db(app):
+    with app.app.app_context():
+        return {row.id for row in app.Diagnosa.query.all()}
+
+
+def _export(client, **params):
+    response = client.get("/api/data-masyarakat/export", query_string=params)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_run_mengarsipkan_bulan_di_luar_jendela_hot(app, pasien):
+    _, archived = _jalankan(app)
+
+    assert archived == {month_key(LAMA): 1, month_key(LEBIH_BARU): 1}
+    assert _ids_di_db(app) == {pasien["hot"]}
+    manifest = app.arsip_store.manifest()
+    assert sorted(e["month"] for e in manifest) == [month_key(LAMA), month_key(LEBIH_BARU)]
+    assert app.arsip_store.find(pasien["lama"])["nama"] == "Arsip lama"
+
+
+def test_run_ulang_melewati_id_yang_sudah_diarsipkan(app, pasien, monkeypatch):
+    # Siklus pertama berhenti setelah file ditulis, sebelum baris dihapus
+    def gagal(self, month, archived_ids):
+        raise RuntimeError("koneksi putus")
+
+    monkeypatch.setattr(RangePartitions, "drop_month", gagal)
+    with pytest.raises(RuntimeError):
+        _jalankan(app)
+    monkeypatch.undo()
+    assert _ids_di_db(app) == set(pasien.values())
+
+    _, archived = _jalankan(app)
+
+    assert archived == {month_key(LEBIH_BARU): 1}
+    assert _ids_di_db(app) == {pasien["hot"]}
+    rows = [e["rows"] for e in app.arsip_store.manifest()]
+    assert sum(rows) == 2
+    assert _jalankan(app)[1] == {}
+
+
+def test_detail_dibaca_dari_arsip(app, client, pasien):
+    _jalankan(app)
+
+    response = client.get(f"/api/data-masyarakat/{pasien['lama']}")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["id"] == pasien["lama"] and data["nama"] == "Arsip lama"
+    assert "created_at" not in data
+
+
+def test_export_rentang_bulan_menggabungkan_arsip_dan_hot(app, client, pasien):
+    _jalankan(app)
+    bulan = lambda value: value.strftime("%Y-%m")  # noqa: E731
+
+    semua = _export(client)
+    satu_bulan = _export(client, dari=bulan(LAMA), sampai=bulan(LAMA))
+    sejak = _export(client, dari=bulan(LEBIH_BARU))
+
+    assert [r["id"] for r in semua] == [pasien["lama"], pasien["lebih_baru"], pasien["hot"]]
+    assert [r["id"] for r in satu_bulan] == [pasien["lama"]]
+    assert [r["id"] for r in sejak] == [pasien["lebih_baru"], pasien["hot"]]
+
+
+def test_hapus_data_yang_sudah_diarsipkan(app, client, pasien):
+    _jalankan(app)
+
+    response = client.delete(f"/api/data-masyarakat/{pasien['lama']}")
+
+    assert response.status_code == 200
+    assert client.get(f"/api/data-masyarakat/{pasien['lama']}").status_code == 404
+    assert client.delete(f"/api/data-masyarakat/{pasien['lama']}").status_code == 404
+    assert [e["month"] for e in app.arsip_store.manifest()] == [month_key(LEBIH_BARU)]
+    assert pasien["lama"] not in [r["id"] for r in _export(client)]
+
+
+def test_lock_arsip_menolak_pemegang_kedua(app):
+    with app.arsip_store.lock():
+        with pytest.raises(ArsipSibuk):
+            with app.arsip_store.lock(timeout=0):
+                pass
+    with app.arsip_store.lock(timeout=0):
+        pass
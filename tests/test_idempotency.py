@@ -0,0 +1,108 @@
+import random
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from loadtest import generate_patient
+
+
+def _post(client, payload, ip, key):
+    return client.post("/api/diagnosis", json=payload, headers={"Idempotency-Key": key},
+                       environ_base={"REMOTE_ADDR": ip})
+
+
+def _jumlah(app, nama):
+    with app.app.app_context():
+        return app.Diagnosa.query.filter_by(nama=nama).count()
+
+
+def test_kunci_sama_klien_berbeda_tidak_berbagi_hasil(app, client):
+    alice = generate_patient(random.Random(1), 1)
+    bob = generate_patient(random.Random(2), 2)
+
+    first = _post(client, alice, "10.0.0.1", "k1")
+    second = _post(client, bob, "10.0.0.2", "k1")
+
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replay"] == "false"
+    assert second.get_json()["nama"] == bob["nama"] != first.get_json()["nama"]
+    assert _jumlah(app, bob["nama"]) == 1
+
+
+def test_kunci_sama_payload_berbeda_ditolak(app, client):
+    _post(client, generate_patient(random.Random(1), 1), "10.0.0.1", "k2")
+
+    response = _post(client, generate_patient(random.Random(2), 2), "10.0.0.1", "k2")
+
+    assert response.status_code == 422
+    assert _jumlah(app, "Pasien Sintetis 2") == 0
+
+
+def test_kiriman_ulang_mengembalikan_hasil_pertama(app, client):
+    payload = generate_patient(random.Random(3), 3)
+    first = _post(client, payload, "10.0.0.1", "k3")
+
+    again = _post(client, payload, "10.0.0.1", "k3")
+
+    assert again.headers["Idempotent-Replay"] == "true"
+    assert again.get_json() == first.get_json()
+    assert _jumlah(app, payload["nama"]) == 1
+
+
+def test_duplikat_bersamaan_hanya_sekali(app):
+    payload = generate_patient(random.Random(4), 4)
+    codes = []
+
+    def kirim():
+        codes.append(_post(app.app.test_client(), payload, "10.0.0.1", "k4").status_code)
+
+    threads = [threading.Thread(target=kirim) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert codes == [200] * 5
+    assert _jumlah(app, payload["nama"]) == 1
+
+
+def test_klaim_yang_diambil_alih_tidak_ditimpa(app):
+    store = app.idempotency_store
+    table = store.table
+    with app.app.app_context():
+        token, _ = store._claim("kunci-lama", "hash")
+        # Klaim kedaluwarsa lalu diambil request lain
+        with app.db.engine.begin() as conn:
+            conn.execute(update(table).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        other, _ = store._claim("kunci-lama", "hash")
+        assert other is None
+        other, _ = store._claim("kunci-lama", "hash")
+        assert other and other != token
+
+        store._finish("kunci-lama", token, ({"dari": "pemilik lama"}, 200))
+
+        with app.db.engine.connect() as conn:
+            row = conn.execute(select(table).where(table.c.kunci == "kunci-lama")).one()
+        assert row.pemilik == other
+        assert row.status is None
+
+
+def test_duplikat_menunggu_dengan_select_saja(app, monkeypatch):
+    store = app.idempotency_store
+    claims = []
+    original = store._claim
+
+    def counting_claim(*args):
+        claims.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(store, "_claim", counting_claim)
+    monkeypatch.setattr(store, "wait_timeout", 0.5)
+    with app.app.app_context():
+        token, _ = original("kunci-sibuk", "hash")
+
+        result, replay = store.run_once("kunci-sibuk", "hash", lambda: ({}, 200))
+
+    assert result[1] == 409 and not replay
+    assert len(claims) == 1
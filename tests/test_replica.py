@@ -0,0 +1,69 @@
+from database import STICKY_HEADER
+
+
+def _nama(response):
+    return {row["nama"] for row in response.get_json()}
+
+
+def test_tanpa_token_membaca_replica(app, client, kirim_pasien, replica):
+    kirim_pasien(1)
+    replica.sync()
+    replica.execute("UPDATE diagnosa SET nama = 'dari replica'")
+    before = app.replica_router.snapshot()["replica_reads"]
+
+    # Klien lain, tanpa cookie sticky dari POST di atas
+    response = app.app.test_client().get("/api/data-masyarakat")
+
+    assert response.status_code == 200
+    assert _nama(response) == {"dari replica"}
+    assert app.replica_router.snapshot()["replica_reads"] == before + 1
+
+
+def test_token_sticky_membaca_primary(app, client, kirim_pasien, replica):
+    replica.sync()
+    token = kirim_pasien(2).headers[STICKY_HEADER]
+    before = app.replica_router.snapshot()["sticky_reads"]
+
+    # Replica belum menerima tulisan terbaru
+    fresh = app.app.test_client()
+    assert _nama(fresh.get("/api/data-masyarakat")) == set()
+    response = fresh.get("/api/data-masyarakat", headers={STICKY_HEADER: token})
+
+    assert _nama(response) == {"Pasien Sintetis 2"}
+    assert app.replica_router.snapshot()["sticky_reads"] == before + 1
+
+
+def test_replica_tanpa_tabel_kembali_ke_primary(app, client, kirim_pasien, replica):
+    kirim_pasien(3)
+    replica.clear()
+    before = app.replica_router.snapshot()["fallbacks"]
+
+    response = app.app.test_client().get("/api/data-masyarakat")
+
+    assert response.status_code == 200
+    assert _nama(response) == {"Pasien Sintetis 3"}
+    assert app.replica_router.snapshot()["fallbacks"] == before + 1
+    assert app.replica_router.snapshot()["replica_available"] is False
+
+
+def test_export_kembali_ke_primary_sebelum_streaming(app, client, kirim_pasien, replica):
+    kirim_pasien(4)
+    replica.clear()
+    before = app.replica_router.snapshot()["fallbacks"]
+
+    response = app.app.test_client().get("/api/data-masyarakat/export?format=ndjson")
+
+    assert response.status_code == 200
+    assert [line for line in response.data.decode().splitlines() if "Pasien Sintetis 4" in line]
+    assert app.replica_router.snapshot()["fallbacks"] == before + 1
+
+
+def test_export_streaming_membaca_replica(app, kirim_pasien, replica):
+    kirim_pasien(5)
+    replica.sync()
+    replica.execute("UPDATE diagnosa SET nama = 'dari replica'")
+
+    response = app.app.test_client().get("/api/data-masyarakat/export?format=ndjson")
+
+    assert response.status_code == 200
+    assert "dari replica" in response.data.decode()
@@ -0,0 +1,35 @@
+import csv
+import json
+import random
+
+import pytest
+
+from loadtest import generate_patient
+from score_file import main
+
+
+def _tulis_ndjson(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_baris_rusak_dan_tinggi_nol_dicatat_sebagai_error(tmp_path):
+    valid = generate_patient(random.Random(1), 1)
+    tinggi_nol = {**generate_patient(random.Random(2), 2), "height": 0}
+    source = tmp_path / "input.ndjson"
+    _tulis_ndjson(source, ["{rusak", "[1, 2]", json.dumps(valid), json.dumps(tinggi_nol)])
+    output = tmp_path / "hasil.csv"
+
+    main([str(source), str(output), "--workers", "1"])
+
+    rows = list(csv.DictReader(output.open(encoding="utf-8")))
+    assert [r["nama"] for r in rows] == ["", "", valid["nama"], tinggi_nol["nama"]]
+    assert rows[0]["error"].startswith("baris 1: JSONDecodeError")
+    assert rows[1]["error"] == "baris 2: bukan objek JSON"
+    assert rows[2]["error"] == "" and rows[2]["diagnosis"]
+    assert rows[3]["error"].startswith("ZeroDivisionError")
+
+
+def test_method_tidak_dikenal_ditolak(capsys):
+    with pytest.raises(SystemExit):
+        main(["input.ndjson", "-", "--method", "tidak_ada"])
+    assert "invalid choice" in capsys.readouterr().err
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from fuzzy import RULE_WEIGHTS, fuzzy_aggregated
+from loadtest import generate_patient
+from shadow import ShadowModel
+from utils import calculate_bmi
+
+
+def _inputs(patient):
+    return (
+        int(patient["usia"]), patient["gender"], calculate_bmi(patient["weight"], patient["height"]),
+        int(patient["sistolik"]), int(patient["diastolik"]),
+        patient["riwayatPenyakit"], patient["riwayatMerokok"], patient["aspekPsikologis"], patient["gejala"],
+    )
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"method": "centroid_grid_3"},
+    {"rule_weights": {"21": 0.5}},
+    {"rule_weights": {"satu": 0.5}},
+    {"gejala_weights": {"batuk": 0.5}},
+])
+def test_konfigurasi_tidak_valid_ditolak(kwargs):
+    with pytest.raises(ValueError):
+        ShadowModel("kandidat", **kwargs)
+
+
+def test_bobot_default_sama_dengan_produksi():
+    model = ShadowModel("kandidat", rule_weights={str(k): v for k, v in RULE_WEIGHTS.items()})
+    for i in range(50):
+        inputs = _inputs(generate_patient(random.Random(i), i))
+        assert fuzzy_aggregated(*inputs, rule_weights=model.rule_weights) == fuzzy_aggregated(*inputs)
+
+
+def test_bobot_rule_default_bisa_diubah():
+    tanpa_gejala = (40, "Pria", 22.0, 115, 75, "Tidak Ada", "Tidak", "Normal", {})
+    model = ShadowModel("kandidat", rule_weights={"18": 0.7})
+
+    assert fuzzy_aggregated(*tanpa_gejala)["tidak_terdeteksi"] == 1.0
+    assert fuzzy_aggregated(*tanpa_gejala, rule_weights=model.rule_weights)["tidak_terdeteksi"] == 0.7